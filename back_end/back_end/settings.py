@@ -78,6 +78,7 @@ MIDDLEWARE = [
 
 
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_EXPOSE_HEADERS = ['X-Next-Cursor']   # 分頁 cursor（MedNameListView）
 
 ROOT_URLCONF = 'back_end.urls'
 
@@ -171,3 +172,57 @@ import os
 GOOGLE_MAPS_KEY = os.getenv("GOOGLE_MAPS_API_KEY")  #金鑰在專案的 .env
 GOOGLE_GEOCODING_KEY = os.getenv("GEOCODING_KEY")
 
+
+# YOLO 血壓辨識：推論在獨立的 process pool（只用 CPU），見 mysite/services/blood_inference.py
+YOLO_MODELS_DIR = os.getenv("YOLO_MODELS_DIR", str(BASE_DIR / "yolo_models"))
+# 多個 web process 時跑 `python manage.py yolo_server` 並設 YOLO_SERVER_ADDRESS（unix socket 路徑，例如
+# /run/longevity/yolo.sock）與 YOLO_SERVER_AUTHKEY（隨機長字串；連線內容會被 unpickle，沒設 server 不啟動），
+# 所有 web process 共用一份模型；沒設位址就用本 process 的 pool，同一台機器只允許一個 process 建（YOLO_POOL_LOCK）
+YOLO_SERVER_ADDRESS = os.getenv("YOLO_SERVER_ADDRESS", "")
+YOLO_SERVER_AUTHKEY = os.getenv("YOLO_SERVER_AUTHKEY", "")
+YOLO_POOL_LOCK = os.getenv("YOLO_POOL_LOCK", "/tmp/longevity-yolo-pool.lock")
+YOLO_WORKERS = int(os.getenv("YOLO_WORKERS", "1"))                 # 推論 worker 數（整台機器共一個 pool）
+YOLO_THREADS_PER_WORKER = int(os.getenv("YOLO_THREADS_PER_WORKER", "1"))
+YOLO_QUEUE_PER_WORKER = 16                                         # 排隊上限（約兩批），超過直接走 GPT fallback
+YOLO_TIMEOUT = float(os.getenv("YOLO_TIMEOUT", "10"))              # 秒
+YOLO_BATCH_WINDOW_MS = int(os.getenv("YOLO_BATCH_WINDOW_MS", "5"))  # 微批次收集時間窗
+YOLO_MAX_BATCH = int(os.getenv("YOLO_MAX_BATCH", "8"))
+IMAGE_MAX_SIDE = 1280   # 上傳影像解碼後的長邊上限（px），見 mysite/services/image_prep.py
+
+# 快取：ocr = 影像辨識結果（SHA-256 為鍵），見 mysite/services/ocr_cache.py
+#       med_schedule = 每位長者編好的用藥時段表，Med / MedTimeSetting 變動時清掉，見 mysite/services/med_schedule.py
+# 多台 / 多 worker 部署時建議改成共用的 Redis / Memcached backend
+# （LocMem 只清得到自己 process 的時段表，其他 worker 最多舊 MED_SCHEDULE_CACHE_TTL 秒）
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "ocr": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "ocr-results",
+        "TIMEOUT": int(os.getenv("OCR_CACHE_TTL", str(60 * 60 * 24))),   # 秒
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("OCR_CACHE_MAX_ENTRIES", "2000"))},
+    },
+    "med_schedule": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "med-schedule",
+        "TIMEOUT": int(os.getenv("MED_SCHEDULE_CACHE_TTL", "300")),   # 秒
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("MED_SCHEDULE_CACHE_MAX_ENTRIES", "5000"))},
+    },
+}
+
+# 藥單 OCR 背景工作的 thread 數（= 同時打 Google Vision / OpenAI 的上限），見 mysite/services/ocr_jobs.py
+OCR_JOB_WORKERS = int(os.getenv("OCR_JOB_WORKERS", "4"))
+
+# 外部服務 client（每個 process 共用一份），見 mysite/services/clients.py
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "30"))          # 秒，每次呼叫
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+VISION_TIMEOUT = float(os.getenv("VISION_TIMEOUT", "15"))          # 秒，每次 RPC
+VISION_RETRY_DEADLINE = float(os.getenv("VISION_RETRY_DEADLINE", "30"))  # 秒，含重試的總預算
+
+# 預先展開的用藥提醒視窗（天），由 `manage.py roll_reminders` 定期重建，見 mysite/services/reminder_occurrences.py
+REMINDER_WINDOW_DAYS = int(os.getenv("REMINDER_WINDOW_DAYS", "7"))
+
+# 通話紀錄匯入每批筆數（一批一次 commit），見 mysite/services/call_ingest.py
+CALL_INGEST_CHUNK = int(os.getenv("CALL_INGEST_CHUNK", "500"))
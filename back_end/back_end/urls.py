@@ -30,8 +30,14 @@ urlpatterns = [
     path('api/ocrblood/', views.BloodYOLOView.as_view(), name='ocr_blood'),
     path('api/fitdata/', views.FitDataAPI.as_view(), name='fitdata'),
     path('api/fitdata/by-date/', views.FitDataByDateAPI.as_view()),
+    path('api/fitdata/bulk/', views.FitDataBulkAPI.as_view(), name='fitdata-bulk'),
+    path('api/fitdata/range/', views.FitDataRangeAPI.as_view(), name='fitdata-range'),
     path('api/healthcare/by-date/', views.HealthCareByDateAPI.as_view()),
+    path('api/healthcare/range/', views.HealthCareRangeAPI.as_view(), name='healthcare-range'),
+    path('api/healthcare/sync/', views.HealthCareSyncAPI.as_view(), name='healthcare-sync'),
     path("api/med/analyze/", views.OcrAnalyzeView.as_view()),
+    path("api/med/analyze/jobs/", views.OcrJobView.as_view(), name='ocr_job_create'),
+    path("api/med/analyze/jobs/<uuid:job_id>/", views.get_ocr_job, name='ocr_job_detail'),
     path('api/mednames/', views.MedNameListView.as_view(), name='medname-list'),
     path('api/meds/<uuid:prescription_id>/', views.get_med_by_prescription),
     path('start_medication/', views.start_medication),
@@ -40,6 +46,8 @@ urlpatterns = [
     # path('api/get-med-time/', views.get_med_time_setting),
     path('api/get-med-reminders/', views.get_med_reminders),
     path('api/get-med-reminders-by-userid/', views.get_med_reminders_by_userid),
+    path('api/med-reminders/family/<int:family_id>/', views.get_family_med_reminders, name='med-reminders-family'),
+    path('api/med-reminders/upcoming/', views.get_upcoming_reminders, name='med-reminders-upcoming'),
     path('api/register/', views.register_user, name='register'),#因為要存入資料庫 所以寫這個
     path('api/account/login/', views.login, name='login'),# 因為要從資料庫拿出來 所以寫這個
     path('api/family/create/', views.CreateFamilyView.as_view(), name='create_family'),
@@ -60,6 +68,8 @@ urlpatterns = [
     path("api/location/family/<int:family_id>/", views.get_family_locations, name="location-family"),
     path("api/reverse_geocode/", views.reverse_geocode, name="reverse-geocode"),
     path('api/call/upload/', views.upload_call_logs),
+    path('api/call/upload/stream/', views.upload_call_logs_stream, name='call-upload-stream'),
+    path('api/call/upload/progress/<str:upload_id>/', views.call_upload_progress, name='call-upload-progress'),
     path('api/callrecords/<int:elder_id>/', views.get_call_records, name='get_call_records'),
     path('api/location/history/<int:elder_id>/', views.location_history,name='location_history'),
     # path('api/call/list/', views.list_call_logs, name='list_call_logs'),
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Family, User, Hos, HealthCare, Med, CallRecord, Scam,FitData
+from .models import Family, User, Hos, HealthCare, Med, CallRecord, Scam,FitData, OcrJob, ReminderOccurrence, DoseLog
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin 
 
@@ -48,6 +48,15 @@ class ScamAdmin(admin.ModelAdmin):
 
 class FitDataAdmin(admin.ModelAdmin):
     list_display = [field.name for field in FitData._meta.fields]
+
+class OcrJobAdmin(admin.ModelAdmin):
+    list_display = ['JobID', 'UserID', 'TargetUserID', 'status', 'error', 'created_at', 'updated_at']
+
+class ReminderOccurrenceAdmin(admin.ModelAdmin):
+    list_display = [field.name for field in ReminderOccurrence._meta.fields]
+
+class DoseLogAdmin(admin.ModelAdmin):
+    list_display = [field.name for field in DoseLog._meta.fields]
     
 
 
@@ -58,4 +67,7 @@ admin.site.register(HealthCare, HealthCareAdmin)
 admin.site.register(Med, MedicineAdmin)
 admin.site.register(CallRecord, CallRecordAdmin)
 admin.site.register(Scam, ScamAdmin)
-admin.site.register(FitData, FitDataAdmin)
\ No newline at end of file
+admin.site.register(FitData, FitDataAdmin)
+admin.site.register(OcrJob, OcrJobAdmin)
+admin.site.register(ReminderOccurrence, ReminderOccurrenceAdmin)
+admin.site.register(DoseLog, DoseLogAdmin)
\ No newline at end of file
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class MysiteConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'mysite'
+
+    def ready(self):
+        from mysite import signals  # noqa: F401（註冊 signal receiver）
@@ -0,0 +1,153 @@
+# mysite/management/commands/bench_call_ingest.py
+"""
+通話紀錄正規化的 benchmark：原本 upload_call_logs 逐筆處理（每次請求重新 introspect 欄位、
+regex 電話、fromisoformat/strptime、if 串的型別對照、一長串 r.get）
+vs. services/call_ingest.normalize_batch（欄位對應載入時決定、alias 表、逐欄批次處理）。
+不碰 DB；先確認兩版結果一致再計時。
+
+    python manage.py bench_call_ingest
+    python manage.py bench_call_ingest --records 50000
+"""
+import random
+import re
+import time
+from datetime import datetime, timedelta, timezone as py_tz
+
+from django.core.management.base import BaseCommand, CommandError
+
+from mysite.management.commands.bench_timeparse import legacy_to_dt
+from mysite.models import CallRecord, User
+from mysite.services import call_ingest
+from mysite.services.timeparse import TAIPEI
+
+
+def legacy_normalize_phone(p):
+    s = re.sub(r'\D', '', p or '')
+    if s.startswith('886') and len(s) >= 11:
+        s = '0' + s[3:]
+    return s
+
+
+def legacy_map_type(t):
+    if t is None:
+        return 'UNKNOWN'
+    s = str(t).strip().upper()
+    if s in ('UNKNOW',):
+        s = 'UNKNOWN'
+    allow = {'INCOMING','OUTGOING','MISSED','REJECTED','BLOCKED','VOICEMAIL','ANSWERED_EXTERNALLY','UNKNOWN'}
+    if s in allow:
+        return s
+    if s == '1': return 'INCOMING'
+    if s == '2': return 'OUTGOING'
+    if s == '3': return 'MISSED'
+    if s == '4': return 'VOICEMAIL'
+    if s == '5': return 'REJECTED'
+    if s == '6': return 'BLOCKED'
+    if s == '7': return 'ANSWERED_EXTERNALLY'
+    return 'UNKNOWN'
+
+
+def legacy_normalize(records, target_user):
+    """原本 upload_call_logs 迴圈的寫法（去掉 print），只留在這裡當基準"""
+    model_fields = {f.name for f in CallRecord._meta.get_fields() if hasattr(f, "attname")}
+    def pick_field(cands):
+        for c in cands:
+            if c in model_fields:
+                return c
+        return None
+
+    PHONE_FIELD    = pick_field(["Phone", "phone"])
+    TIME_FIELD     = pick_field(["PhoneTime", "phone_time", "time", "Timestamp"])
+    USER_FIELD     = pick_field(["UserId", "user", "user_id"])
+    DURATION_FIELD = pick_field(["duration_sec","DurationSec","Duration","duration","CallDuration","Seconds","Secs"])
+    TYPE_FIELD     = pick_field(["status","Status","Type","type","CallType","Direction"])
+    NAME_FIELD     = pick_field(["PhoneName","phone_name","Name","ContactName"])
+
+    cleaned = []
+    for r in records:
+        phone = legacy_normalize_phone(str(r.get("phone") or r.get("Phone") or ''))
+        ts = legacy_to_dt(r.get("timestamp") or r.get("PhoneTime") or r.get("time"))
+        if not phone or not ts:
+            continue
+        raw_type = (
+            r.get("type") or r.get("status") or r.get("Type") or
+            r.get("CallType") or r.get("Direction") or
+            r.get("rawType") or (r.get("extra") or {}).get("rawType")
+        )
+        raw_dur = (
+            r.get("duration_sec") or r.get("DurationSec") or r.get("Duration") or
+            r.get("duration") or r.get("CallDuration") or r.get("Seconds") or r.get("Secs")
+        )
+        try:
+            dur_sec = max(int(raw_dur or 0), 0)
+        except Exception:
+            dur_sec = 0
+        name = str(r.get("name") or r.get("PhoneName") or '').strip() or '未知來電'
+        cleaned.append({
+            USER_FIELD: target_user, PHONE_FIELD: phone, TIME_FIELD: ts,
+            TYPE_FIELD: legacy_map_type(raw_type), DURATION_FIELD: dur_sec, NAME_FIELD: name[:50],
+        })
+    return cleaned
+
+
+def make_records(n, seed=0):
+    """手機端實際會送的樣子：大多是 App 的 ISO + 'Z'，夾雜舊版 / 其他裝置的寫法"""
+    rng = random.Random(seed)
+    contacts = [(f"+886 9{rng.randrange(10**8):08d}", f"聯絡人{i}") for i in range(300)]
+    start = datetime(2025, 1, 1, tzinfo=py_tz.utc)
+    out = []
+    for i in range(n):
+        phone, name = rng.choice(contacts)
+        at = start + timedelta(seconds=rng.randrange(300 * 86400))
+        kind = rng.random()
+        if kind < 0.7:
+            out.append({
+                "phone": phone, "name": name, "type": rng.choice(["INCOMING", "OUTGOING", "MISSED", "REJECTED"]),
+                "timestamp": at.isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+                "duration": rng.randrange(600), "extra": {"rawType": rng.randrange(1, 8)},
+            })
+        elif kind < 0.9:
+            out.append({
+                "Phone": phone.replace(" ", "-"), "PhoneName": "", "status": str(rng.randrange(1, 8)),
+                "PhoneTime": int(at.timestamp() * 1000), "DurationSec": str(rng.randrange(600)),
+            })
+        else:
+            out.append({
+                "phone": phone, "time": at.astimezone(TAIPEI).strftime("%Y/%m/%d %H:%M"),
+                "extra": {"rawType": rng.randrange(1, 8)}, "Seconds": rng.randrange(600),
+            })
+    return out
+
+
+class Command(BaseCommand):
+    help = "比較逐筆與整批逐欄的通話紀錄正規化速度（不寫 DB）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--records", type=int, default=10_000, help="筆數（預設 10000）")
+        parser.add_argument("--rounds", type=int, default=5, help="各跑幾次取最快（預設 5）")
+
+    def handle(self, *args, **options):
+        records = make_records(options["records"])
+        user = User(pk=1)
+
+        legacy_rows = legacy_normalize(records, user)
+        batch_rows, invalid = call_ingest.normalize_batch(records, user)
+        if invalid or legacy_rows != batch_rows:
+            diff = next(((a, b) for a, b in zip(legacy_rows, batch_rows) if a != b), None)
+            raise CommandError(f"結果不一致（invalid={invalid}）：{diff}")
+
+        def best(fn):
+            times = []
+            for _ in range(options["rounds"]):
+                t0 = time.perf_counter()
+                fn(records, user)
+                times.append(time.perf_counter() - t0)
+            return min(times)
+
+        legacy = best(legacy_normalize)
+        batch = best(lambda rs, u: call_ingest.normalize_batch(rs, u))
+
+        n = len(records)
+        self.stdout.write(f"{n} 筆，結果一致")
+        for name, sec in (("legacy per-record", legacy), ("normalize_batch", batch)):
+            self.stdout.write(f"{name:<20}{sec * 1000:>8.1f} ms   {sec * 1e6 / n:>6.2f} µs/筆   x{legacy / sec:.1f}")
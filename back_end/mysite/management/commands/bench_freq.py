@@ -0,0 +1,92 @@
+# mysite/management/commands/bench_freq.py
+"""
+用藥頻率解析的 micro-benchmark：舊版逐條 re.search vs. services/med_freq。
+語料是藥袋 OCR 常見的寫法（含全形、空白、打字錯），先確認兩版結果一致再計時。
+
+    python manage.py bench_freq
+    python manage.py bench_freq --rounds 500
+"""
+import re
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from mysite.services import med_freq
+
+# 藥袋 / GPT 回傳的頻率字串
+CORPUS = [
+    "x1x7", "x2x7", "x3x7", "x4x3", "xlx3", "X3X14", "Ｘ2Ｘ28", "×3×7", "＊1＊30",
+    "內服 1.00 x4x3", "口服 0.5 x2x14", "1 顆 x3x7 飯後", "x5x3",
+    "一天一次", "一天兩次", "一天三次", "一天四次", "一天1次", "一天 2 次", "一天3次",
+    "每日 3 次", "每日4次", "每日1次 7天", "3次/日", "2 次／日", "4次/日", "1次/日 早餐後",
+    "睡前", "睡覺前", "睡前 1 顆", "一天1次 睡前", "必要時", "必要時服用", "PRN", "prn 疼痛時",
+    "飯後", "早晚各一次", "", " ", "一天三次 ", "　睡前　", "每日兩次", "QID", "BID",
+    "未知",
+]
+
+
+def legacy_normalize_freq(text):
+    """原本 prescription_ocr.normalize_freq 的實作，只留在這裡當基準"""
+    if not text:
+        return "未知"
+    t = str(text).strip()
+    t = t.replace("Ｘ", "x").replace("＊", "x").replace("×", "x")
+    t = t.replace("：", ":").replace("／", "/")
+    t = re.sub(r"\s+", "", t)
+    t = t.replace("xlx", "x1x")
+
+    m = re.search(r"x(\d)x(\d+)", t, flags=re.IGNORECASE)
+    if m:
+        n = int(m.group(1))
+        return {1: "一天一次", 2: "一天兩次", 3: "一天三次", 4: "一天四次"}.get(n, "未知")
+
+    for n, lab in [(4, "一天四次"), (3, "一天三次"), (2, "一天兩次"), (1, "一天一次")]:
+        if re.search(fr"(一天|每日){n}次", t):
+            return lab
+        if re.search(fr"{n}次/日", t):
+            return lab
+
+    if re.search(r"睡前|睡覺前", t):
+        return "睡前"
+    if re.search(r"必要時|PRN", t, flags=re.IGNORECASE):
+        return "必要時"
+    if t in med_freq.ALLOWED_FREQ:
+        return t
+    return "未知"
+
+
+class Command(BaseCommand):
+    help = "比較舊版與預先編譯 + memo 的用藥頻率解析速度"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rounds", type=int, default=200, help="整份語料重複幾輪（預設 200）")
+
+    def handle(self, *args, **options):
+        rounds = options["rounds"]
+
+        mismatches = [
+            (s, legacy_normalize_freq(s), med_freq.normalize_freq(s))
+            for s in CORPUS
+            if legacy_normalize_freq(s) != med_freq.normalize_freq(s)
+        ]
+        if mismatches:
+            raise CommandError(f"結果不一致：{mismatches}")
+
+        def run(fn, clear=False):
+            t0 = time.perf_counter()
+            for _ in range(rounds):
+                if clear:
+                    med_freq.parse_freq.cache_clear()
+                for s in CORPUS:
+                    fn(s)
+            return time.perf_counter() - t0
+
+        n = rounds * len(CORPUS)
+        legacy = run(legacy_normalize_freq)
+        cold = run(med_freq.normalize_freq, clear=True)   # 每輪清掉 memo：只比規則本身
+        med_freq.parse_freq.cache_clear()
+        warm = run(med_freq.normalize_freq)                # 實際情況：重複寫法直接命中 memo
+
+        self.stdout.write(f"{n} 筆（{len(CORPUS)} 種寫法 × {rounds} 輪），結果一致")
+        for name, sec in (("legacy re.search", legacy), ("compiled (no memo)", cold), ("compiled + memo", warm)):
+            self.stdout.write(f"{name:<22}{sec * 1e6 / n:>8.2f} µs/筆   x{legacy / sec:.1f}")
@@ -0,0 +1,102 @@
+# mysite/management/commands/bench_timeparse.py
+"""
+時間解析的 micro-benchmark：舊版 to_dt（fromisoformat 失敗後逐一 try strptime、每次建 ZoneInfo）
+vs. services/timeparse.parse_timestamp。
+語料混合手機通話紀錄、血壓上傳常見的格式，先確認兩版結果一致再計時。
+
+    python manage.py bench_timeparse
+    python manage.py bench_timeparse --rounds 5000
+"""
+import time
+from datetime import datetime, timezone as py_tz
+from zoneinfo import ZoneInfo
+
+from django.core.management.base import BaseCommand, CommandError
+
+from mysite.services.timeparse import parse_timestamp
+
+CORPUS = [
+    1758378932343, 1758378932, "1758378932343", "1758378932", 1758378932.5,
+    "2025-09-20T14:35:32.343Z", "2025-09-20T14:35:32Z", "2025-09-20T22:35:32+08:00",
+    "2025-09-20T14:35:32", "2025-09-20 14:35:32", "2025-09-20 14:35", "2025-09-20",
+    "2025/09/20 14:35:32", "2025/09/20 14:35", " 2025-09-20 14:35:32 ",
+    datetime(2025, 9, 20, 14, 35, 32, tzinfo=py_tz.utc),
+]
+
+
+def legacy_to_dt(obj):
+    """原本 views/call.py 的 to_dt，只留在這裡當基準（解析失敗回 None 方便比對）"""
+    tw = ZoneInfo('Asia/Taipei')
+    dt = None
+
+    if isinstance(obj, datetime):
+        dt = obj.astimezone(py_tz.utc) if obj.tzinfo else obj.replace(tzinfo=py_tz.utc)
+
+    elif isinstance(obj, (int, float)) or (isinstance(obj, str) and obj.isdigit()):
+        n = int(obj)
+        if n > 10_000_000_000:  # ms
+            n = n / 1000.0
+        dt = datetime.fromtimestamp(n, tz=py_tz.utc)
+
+    elif isinstance(obj, str):
+        s = obj.strip().replace('Z', '+00:00')
+        try:
+            d = datetime.fromisoformat(s)
+            dt = d.astimezone(py_tz.utc) if d.tzinfo else d.replace(tzinfo=tw).astimezone(py_tz.utc)
+        except Exception:
+            for f in ('%Y-%m-%d %H:%M:%S','%Y-%m-%d %H:%M','%Y/%m/%d %H:%M:%S','%Y/%m/%d %H:%M','%Y-%m-%dT%H:%M:%S','%Y-%m-%d'):
+                try:
+                    naive = datetime.strptime(s, f)
+                    dt = naive.replace(tzinfo=tw).astimezone(py_tz.utc)
+                    break
+                except Exception:
+                    pass
+
+    if dt is None:
+        return None
+    return dt.astimezone(py_tz.utc).replace(second=0, microsecond=0)
+
+
+def new_to_dt(obj):
+    return parse_timestamp(obj, minute=True)
+
+
+class Command(BaseCommand):
+    help = "比較舊版 to_dt 與共用 timeparse 的解析速度（混合格式）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rounds", type=int, default=2000, help="整份語料重複幾輪（預設 2000）")
+
+    def handle(self, *args, **options):
+        rounds = options["rounds"]
+
+        mismatches = [(v, legacy_to_dt(v), new_to_dt(v)) for v in CORPUS if legacy_to_dt(v) != new_to_dt(v)]
+        if mismatches:
+            raise CommandError(f"結果不一致：{mismatches}")
+
+        def run(fn):
+            t0 = time.perf_counter()
+            for _ in range(rounds):
+                for v in CORPUS:
+                    fn(v)
+            return time.perf_counter() - t0
+
+        n = rounds * len(CORPUS)
+        legacy = run(legacy_to_dt)
+        new = run(new_to_dt)
+
+        self.stdout.write(f"{n} 筆（{len(CORPUS)} 種格式 × {rounds} 輪），結果一致")
+        for name, sec in (("legacy to_dt", legacy), ("timeparse", new)):
+            self.stdout.write(f"{name:<16}{sec * 1e6 / n:>8.2f} µs/筆   x{legacy / sec:.1f}")
+
+        # 各格式分開看：舊版慢在哪裡
+        self.stdout.write("")
+        for v in CORPUS:
+            t0 = time.perf_counter()
+            for _ in range(rounds):
+                legacy_to_dt(v)
+            t1 = time.perf_counter()
+            for _ in range(rounds):
+                new_to_dt(v)
+            t2 = time.perf_counter()
+            self.stdout.write(f"{str(v)[:34]:<36}{(t1 - t0) * 1e6 / rounds:>7.2f} → {(t2 - t1) * 1e6 / rounds:>5.2f} µs")
@@ -0,0 +1,117 @@
+# mysite/management/commands/import_report.py
+"""
+啟動成本報告：每個模組都在「全新的 Python 行程」裡 django.setup() 之後再 import，
+量測 import 花費的時間與 RSS 增量，方便確認 views 沒有在啟動時就把重量級套件載進來。
+子模組（例如 mysite.views.med）量的是它自己：上層 package 的 __init__ 不執行
+（mysite/views/__init__.py 會把所有子模組都 import 進來，不跳過的話每一列都是整包的成本）。
+import 期間就被解開的 LazyModule（services/lazy_imports.LOAD_TIMES）也列在 note。
+
+    python manage.py import_report
+    python manage.py import_report mysite.views.med cv2
+"""
+import json
+import os
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand
+
+VIEW_MODULES = [
+    "mysite.views",
+    "mysite.views.account",
+    "mysite.views.health",
+    "mysite.views.med",
+    "mysite.views.fit",
+    "mysite.views.hospital",
+    "mysite.views.call",
+    "mysite.views.location",
+]
+
+HEAVY_MODULES = [
+    "numpy",
+    "cv2",
+    "ultralytics",
+    "google.cloud.vision",
+    "openai",
+]
+
+# 子行程執行的程式：先 setup Django（扣掉共同成本），再量目標模組
+_PROBE = r"""
+import importlib, importlib.util, json, os, sys, time
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", sys.argv[2])
+import django
+django.setup()
+# 上層 package 還沒載入的話，只建出 package 物件、不執行它的 __init__
+parent, _, _ = sys.argv[1].rpartition(".")
+if parent and parent not in sys.modules:
+    grand, _, short = parent.rpartition(".")
+    try:
+        if grand:
+            importlib.import_module(grand)
+        spec = importlib.util.find_spec(parent)
+    except ImportError:
+        spec = None  # 套件不存在：留給下面的 import 回報錯誤
+    if spec is not None and spec.submodule_search_locations is not None:
+        sys.modules[parent] = importlib.util.module_from_spec(spec)
+        if grand:
+            setattr(sys.modules[grand], short, sys.modules[parent])
+def rss():
+    # 目前 RSS（KB）；沒有 /proc 的平台（Windows/macOS）就不報
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, AttributeError):
+        return None
+before = rss()
+t0 = time.perf_counter()
+try:
+    importlib.import_module(sys.argv[1])
+    err = None
+except Exception as e:
+    err = f"{type(e).__name__}: {e}"
+elapsed = time.perf_counter() - t0
+after = rss()
+print(json.dumps({
+    "ms": round(elapsed * 1000, 1),
+    "rss_kb": (after - before) if before is not None else None,
+    "error": err,
+    "heavy_loaded": [m for m in json.loads(sys.argv[3]) if m in sys.modules],
+    "lazy_resolved": getattr(sys.modules.get("mysite.services.lazy_imports"), "LOAD_TIMES", {}),
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = "列出每個 views 子模組與重量級相依的 import 時間 / RSS 增量（各自在新行程量測）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("modules", nargs="*", help="要量測的模組（預設：所有 views 子模組 + 重量級相依）")
+
+    def handle(self, *args, **options):
+        modules = options["modules"] or (VIEW_MODULES + HEAVY_MODULES)
+        settings_module = os.environ.get("DJANGO_SETTINGS_MODULE", "back_end.settings")
+
+        self.stdout.write(f"{'module':<28}{'import ms':>12}{'RSS +KB':>12}  note")
+        for name in modules:
+            proc = subprocess.run(
+                [sys.executable, "-c", _PROBE, name, settings_module, json.dumps(HEAVY_MODULES)],
+                capture_output=True, text=True,
+            )
+            try:
+                res = json.loads(proc.stdout.strip().splitlines()[-1])
+            except (IndexError, ValueError):
+                self.stdout.write(f"{name:<28}{'-':>12}{'-':>12}  probe failed: {proc.stderr.strip()[-200:]}")
+                continue
+
+            if res["error"]:
+                note = res["error"]
+            elif res["heavy_loaded"]:
+                note = "loaded heavy deps: " + ", ".join(res["heavy_loaded"])
+            else:
+                note = ""
+            if res["lazy_resolved"]:
+                # LazyModule 在 import 期間就被存取，延遲載入沒有作用
+                lazy = ", ".join(f"{m} {sec * 1000:.0f}ms" for m, sec in res["lazy_resolved"].items())
+                note = f"{note}; lazy resolved at import: {lazy}" if note else f"lazy resolved at import: {lazy}"
+            rss_kb = "-" if res["rss_kb"] is None else res["rss_kb"]
+            self.stdout.write(f"{name:<28}{res['ms']:>12}{rss_kb:>12}  {note}")
@@ -0,0 +1,29 @@
+# mysite/management/commands/roll_reminders.py
+"""
+重建預先展開的用藥提醒（ReminderOccurrence），維持「從現在起 REMINDER_WINDOW_DAYS 天」的視窗。
+排進 cron / systemd timer 定期執行，例如每小時：
+
+    0 * * * *  cd /path/to/back_end && python manage.py roll_reminders
+    python manage.py roll_reminders --user 12 --user 15 --days 3
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from mysite.services import reminder_occurrences
+
+
+class Command(BaseCommand):
+    help = "重建未來 N 天的用藥提醒（ReminderOccurrence）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None, help="視窗天數（預設 settings.REMINDER_WINDOW_DAYS）")
+        parser.add_argument("--user", type=int, action="append", dest="users", help="只重建指定 UserID（可重複）")
+
+    def handle(self, *args, **options):
+        t0 = time.perf_counter()
+        written = reminder_occurrences.roll(options["users"], days=options["days"])
+        purged = 0 if options["users"] else reminder_occurrences.purge_orphans()
+        self.stdout.write(
+            f"寫入 {written} 筆提醒，清除 {purged} 筆無設定的提醒（{time.perf_counter() - t0:.2f}s）"
+        )
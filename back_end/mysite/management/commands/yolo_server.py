@@ -0,0 +1,47 @@
+# mysite/management/commands/yolo_server.py
+"""
+共用的 YOLO 推論 server：多個 web process（gunicorn -w N）時只跑這一個，
+模型只載入一份，所有 worker 的請求在這裡一起微批次。見 services/blood_inference.py。
+
+連線內容會被 unpickle，所以一定要設 YOLO_SERVER_AUTHKEY（web process 用同一把），
+位址預設是 unix socket；TCP 只接受 loopback，要聽其他介面得明確帶 --allow-remote。
+
+    YOLO_SERVER_AUTHKEY=... YOLO_SERVER_ADDRESS=/run/longevity/yolo.sock python manage.py yolo_server
+    python manage.py yolo_server --address /run/longevity/yolo.sock
+"""
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from mysite.services import blood_inference
+
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), "longevity-yolo.sock")
+
+
+class Command(BaseCommand):
+    help = "啟動共用的 YOLO 血壓推論 server（web process 設 YOLO_SERVER_ADDRESS 連過來）"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--address", default=None,
+            help=f"unix socket 路徑或 'host:port'（預設 settings.YOLO_SERVER_ADDRESS，再來是 {DEFAULT_SOCKET}）",
+        )
+        parser.add_argument(
+            "--allow-remote", action="store_true",
+            help="允許聽非 loopback 的 TCP 位址（只在有防火牆隔離的內網使用）",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.YOLO_SERVER_AUTHKEY:
+            raise CommandError("請設定 YOLO_SERVER_AUTHKEY（web process 用同一把；連線內容會被 unpickle）")
+        address = blood_inference.parse_address(
+            options["address"] or settings.YOLO_SERVER_ADDRESS or DEFAULT_SOCKET
+        )
+        if not blood_inference.is_loopback(address) and not options["allow_remote"]:
+            raise CommandError(f"{address} 不是 loopback；改用 unix socket，或確定要開放時帶 --allow-remote")
+        self.stdout.write(f"YOLO 推論 server：{address}（{settings.YOLO_WORKERS} 個 worker）")
+        if address == DEFAULT_SOCKET and not settings.YOLO_SERVER_ADDRESS:
+            self.stdout.write(f"web process 請設定 YOLO_SERVER_ADDRESS={address}")
+        blood_inference.serve(address)
@@ -0,0 +1,69 @@
+# Generated by Django 5.2 on 2026-10-17 17:19
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mysite", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OcrJob",
+            fields=[
+                (
+                    "JobID",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "排隊中"),
+                            ("running", "處理中"),
+                            ("done", "完成"),
+                            ("failed", "失敗"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                    ),
+                ),
+                ("result", models.JSONField(blank=True, null=True)),
+                ("error", models.CharField(blank=True, default="", max_length=255)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "TargetUserID",
+                    models.ForeignKey(
+                        db_column="TargetUserID",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "UserID",
+                    models.ForeignKey(
+                        db_column="UserID",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ocr_jobs",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "OcrJob",
+                "verbose_name_plural": "OcrJob",
+            },
+        ),
+    ]
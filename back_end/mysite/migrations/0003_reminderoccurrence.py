@@ -0,0 +1,53 @@
+# Generated by Django 5.2 on 2026-10-17 17:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mysite", "0002_ocrjob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReminderOccurrence",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("RemindAt", models.DateTimeField()),
+                ("Slot", models.CharField(max_length=10)),
+                ("MedName", models.CharField(max_length=50)),
+                ("DosageFrequency", models.CharField(max_length=50)),
+                ("PrescriptionID", models.UUIDField()),
+                ("Disease", models.CharField(max_length=50)),
+                (
+                    "UserID",
+                    models.ForeignKey(
+                        db_column="UserID",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reminder_occurrences",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "ReminderOccurrence",
+                "verbose_name_plural": "ReminderOccurrence",
+                "indexes": [
+                    models.Index(
+                        fields=["UserID", "RemindAt"], name="idx_reminder_user_at"
+                    )
+                ],
+            },
+        ),
+    ]
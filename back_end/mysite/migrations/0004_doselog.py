@@ -0,0 +1,72 @@
+# Generated by Django 5.2 on 2026-10-17 17:27
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mysite", "0003_reminderoccurrence"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="med",
+            name="FinishedAt",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name="DoseLog",
+            fields=[
+                ("LogID", models.AutoField(primary_key=True, serialize=False)),
+                ("MedName", models.CharField(max_length=50)),
+                ("PrescriptionID", models.UUIDField()),
+                ("DoseNumber", models.IntegerField()),
+                ("TotalDosage", models.IntegerField(default=0)),
+                ("TakenAt", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "MedID",
+                    models.ForeignKey(
+                        blank=True,
+                        db_column="MedID",
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="dose_logs",
+                        to="mysite.med",
+                    ),
+                ),
+                (
+                    "RecordedBy",
+                    models.ForeignKey(
+                        blank=True,
+                        db_column="RecordedBy",
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "UserID",
+                    models.ForeignKey(
+                        db_column="UserID",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="dose_logs",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "DoseLog",
+                "verbose_name_plural": "DoseLog",
+                "indexes": [
+                    models.Index(
+                        fields=["UserID", "TakenAt"], name="idx_doselog_user_taken"
+                    )
+                ],
+            },
+        ),
+    ]
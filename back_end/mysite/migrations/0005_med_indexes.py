@@ -0,0 +1,42 @@
+# Generated by Django 5.2 on 2026-10-17 17:29
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def dedupe_med_time_settings(apps, schema_editor):
+    # 加唯一限制前，重複的設定只留每位長者最新的一筆
+    MedTimeSetting = apps.get_model("mysite", "MedTimeSetting")
+    keep = (
+        MedTimeSetting.objects.values("UserID")
+        .annotate(last_id=Max("id"))
+        .values_list("last_id", flat=True)
+    )
+    MedTimeSetting.objects.exclude(id__in=list(keep)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mysite", "0004_doselog"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="med",
+            index=models.Index(
+                fields=["PrescriptionID", "UserID"], name="idx_med_rx_user"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="med",
+            index=models.Index(fields=["UserID", "MedName"], name="idx_med_user_name"),
+        ),
+        migrations.RunPython(dedupe_med_time_settings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="medtimesetting",
+            constraint=models.UniqueConstraint(
+                fields=("UserID",), name="uniq_medtimesetting_user"
+            ),
+        ),
+    ]
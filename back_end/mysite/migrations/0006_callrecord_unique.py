@@ -0,0 +1,52 @@
+# Generated by Django 5.2 on 2026-10-17 18:42
+
+from django.db import migrations, models
+
+
+def dedupe_call_records(apps, schema_editor):
+    # 加唯一限制前，同 (UserId, Phone, PhoneTime) 只留最早的一筆；
+    # 掛在重複列上的 Scam 改掛到留下的那筆，IsScam 有任何一筆為真就保留
+    CallRecord = apps.get_model("mysite", "CallRecord")
+    Scam = apps.get_model("mysite", "Scam")
+    rows = (
+        CallRecord.objects.order_by("UserId", "Phone", "PhoneTime", "CallId")
+        .values_list("UserId", "Phone", "PhoneTime", "CallId", "IsScam")
+        .iterator(chunk_size=5000)
+    )
+    keep_of = {}          # 重複列 CallId → 留下的 CallId
+    scam_keep = set()
+    prev_key, keep = None, None
+    for user_id, phone, phone_time, call_id, is_scam in rows:
+        key = (user_id, phone, phone_time)
+        if key != prev_key:
+            prev_key, keep = key, call_id
+            continue
+        keep_of[call_id] = keep
+        if is_scam:
+            scam_keep.add(keep)
+
+    for dupe_id, keep_id in keep_of.items():
+        Scam.objects.filter(Phone_id=dupe_id).update(Phone_id=keep_id)
+    if scam_keep:
+        CallRecord.objects.filter(CallId__in=scam_keep).update(IsScam=True)
+    dupe_ids = list(keep_of)
+    for i in range(0, len(dupe_ids), 1000):
+        CallRecord.objects.filter(CallId__in=dupe_ids[i:i + 1000]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mysite", "0005_med_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_call_records, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="callrecord",
+            constraint=models.UniqueConstraint(
+                fields=("UserId", "Phone", "PhoneTime"),
+                name="uniq_callrecord_user_phone_time",
+            ),
+        ),
+    ]
@@ -196,10 +196,36 @@ class Med(models.Model):
     # 新增的欄位
     TotalDosage = models.IntegerField(default=0)  # 記錄總次數
     CurrentDosage = models.IntegerField(default=0)  # 記錄當前已服用次數
+    FinishedAt = models.DateTimeField(null=True, blank=True)  # 吃完的時間（不再刪除，服藥紀錄見 DoseLog）
 
     class Meta:
         verbose_name = "Med"
         verbose_name_plural = "Med"
+        indexes = [
+            # PrescriptionID 放前面：單看藥單（get_med_by_prescription）也用得到
+            models.Index(fields=['PrescriptionID', 'UserID'], name='idx_med_rx_user'),    # 藥單查詢 / 刪除
+            models.Index(fields=['UserID', 'MedName'], name='idx_med_user_name'),        # 服藥記錄
+        ]
+
+
+class DoseLog(models.Model):
+    """服藥紀錄（只新增不修改），用來看服藥遵從度"""
+    LogID = models.AutoField(primary_key=True)
+    UserID = models.ForeignKey(User, on_delete=models.CASCADE, db_column='UserID', related_name='dose_logs')  # 吃藥的長者
+    MedID = models.ForeignKey(Med, on_delete=models.SET_NULL, null=True, blank=True, db_column='MedID', related_name='dose_logs')
+    MedName = models.CharField(max_length=50)
+    PrescriptionID = models.UUIDField()
+    DoseNumber = models.IntegerField()      # 這是第幾次（記錄後的 CurrentDosage）
+    TotalDosage = models.IntegerField(default=0)
+    RecordedBy = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, db_column='RecordedBy', related_name='+')  # 按下的人（長者或家人）
+    TakenAt = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "DoseLog"
+        verbose_name_plural = "DoseLog"
+        indexes = [
+            models.Index(fields=['UserID', 'TakenAt'], name='idx_doselog_user_taken'),
+        ]
 
 
 class MedTimeSetting(models.Model):
@@ -213,6 +239,53 @@ class MedTimeSetting(models.Model):
     class Meta:
         verbose_name = "MedTimeSetting"
         verbose_name_plural = "MedTimeSetting"
+        # 每位長者只有一組用藥時間
+        constraints = [
+            models.UniqueConstraint(fields=["UserID"], name="uniq_medtimesetting_user")
+        ]
+
+class OcrJob(models.Model):
+    """藥單 OCR 背景工作（POST 立即回 JobID，前端再輪詢狀態）"""
+    STATUS_CHOICES = [
+        ('pending', '排隊中'),
+        ('running', '處理中'),
+        ('done', '完成'),
+        ('failed', '失敗'),
+    ]
+
+    JobID = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    UserID = models.ForeignKey(User, on_delete=models.CASCADE, db_column='UserID', related_name='ocr_jobs')  # 送出的人
+    TargetUserID = models.ForeignKey(User, on_delete=models.CASCADE, db_column='TargetUserID', related_name='+')  # 藥單歸屬的長者
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    result = models.JSONField(null=True, blank=True)   # 與同步 API 相同的回傳內容
+    error = models.CharField(max_length=255, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "OcrJob"
+        verbose_name_plural = "OcrJob"
+
+
+class ReminderOccurrence(models.Model):
+    """預先展開的用藥提醒（未來 REMINDER_WINDOW_DAYS 天），由 roll_reminders 定期重建"""
+    UserID = models.ForeignKey(User, on_delete=models.CASCADE, db_column='UserID', related_name='reminder_occurrences')
+    RemindAt = models.DateTimeField()                   # DB 存 UTC
+    Slot = models.CharField(max_length=10)              # morning / noon / evening / bedtime
+    MedName = models.CharField(max_length=50)
+    DosageFrequency = models.CharField(max_length=50)
+    PrescriptionID = models.UUIDField()
+    Disease = models.CharField(max_length=50)
+
+    class Meta:
+        verbose_name = "ReminderOccurrence"
+        verbose_name_plural = "ReminderOccurrence"
+        indexes = [
+            models.Index(fields=['UserID', 'RemindAt'], name='idx_reminder_user_at'),
+        ]
+
+
+_TAIPEI = ZoneInfo('Asia/Taipei')
 
 class CallRecord(models.Model):
     CallId = models.AutoField(primary_key=True)
@@ -248,9 +321,13 @@ class CallRecord(models.Model):
             models.Index(fields=['Phone']),
             models.Index(fields=['status']),
         ]
+        constraints = [
+            # 同一位長者、同一支電話、同一分鐘視為同一通；上傳靠它去重（bulk_create ignore_conflicts）
+            models.UniqueConstraint(fields=['UserId', 'Phone', 'PhoneTime'], name='uniq_callrecord_user_phone_time'),
+        ]
 
     def to_dict(self):
-        tz = ZoneInfo('Asia/Taipei')
+        tz = _TAIPEI
         return {
             'CallId': self.CallId,
             'UserId': self.UserId_id,
@@ -230,10 +230,8 @@ class LocationHistorySerializer(serializers.ModelSerializer):
 
 from rest_framework import serializers
 from django.utils import timezone
-from django.utils.dateparse import parse_datetime
-from zoneinfo import ZoneInfo
-from datetime import datetime
 from .models import CallRecord
+from .services.timeparse import parse_timestamp
 TYPE_MAP = {
     '1': 'INCOMING', '2': 'OUTGOING', '3': 'MISSED', '4': 'VOICEMAIL',
     '5': 'REJECTED', '6': 'BLOCKED', '7': 'ANSWERED_EXTERNALLY',
@@ -255,34 +253,12 @@ class CallRecordCreateSerializer(serializers.ModelSerializer):
 
         # 2) PhoneTime：接受 ISO(+08:00)/epoch(秒或毫秒)/無時區字串(視為台灣時間)
         raw = attrs.get('PhoneTime')
-        dt = None
-        if isinstance(raw, (int, float)) or (isinstance(raw, str) and raw.isdigit()):
-            n = int(raw)
-            if n > 10_000_000_000:  # ms
-                dt = timezone.datetime.fromtimestamp(n / 1000.0, tz=timezone.utc)
-            else:
-                dt = timezone.datetime.fromtimestamp(n, tz=timezone.utc)
-        elif isinstance(raw, str):
-            dt = parse_datetime(raw)  # 若含時區會回 aware
-            if dt is None:
-                tw = ZoneInfo('Asia/Taipei')
-                for f in ['%Y-%m-%d %H:%M:%S','%Y-%m-%d %H:%M','%Y/%m/%d %H:%M:%S','%Y/%m/%d %H:%M','%Y-%m-%dT%H:%M:%S','%Y-%m-%d']:
-                    try:
-                        naive = datetime.strptime(raw, f)
-                        dt = naive.replace(tzinfo=tw).astimezone(timezone.utc)
-                        break
-                    except Exception:
-                        pass
-        else:
-            dt = timezone.now()
-
+        dt = parse_timestamp(raw if raw not in (None, '') else timezone.now(), minute=True)
         if dt is None:
             raise serializers.ValidationError({'PhoneTime': '無法解析時間格式'})
 
         # 3) 存 UTC，且「只到分鐘」：清秒/微秒
-        if timezone.is_naive(dt):
-            dt = timezone.make_aware(dt, timezone=timezone.utc)
-        attrs['PhoneTime'] = dt.astimezone(timezone.utc).replace(second=0, microsecond=0)
+        attrs['PhoneTime'] = dt
 
         # 4) duration_sec 非負
         d = attrs.get('duration_sec') or 0
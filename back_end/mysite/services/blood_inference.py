@@ -0,0 +1,430 @@
+# mysite/services/blood_inference.py
+"""
+血壓計 YOLO 推論服務：獨立的 process pool（只用 CPU）。
+
+- region 模型找出收縮壓/舒張壓/心跳三個欄位，digits 模型讀出每個欄位的數字；
+  兩個模型只存在推論 worker 裡，每個 worker 啟動時載入一次；
+  web worker 本身不 import ultralytics，也不會常駐模型。
+- view 呼叫 detect_readings(image)，影像經 pool 的佇列送進 worker，
+  等待 settings.YOLO_TIMEOUT 秒；逾時 / 佇列滿 / 推論失敗都丟 InferenceError，
+  由 view 決定要不要走 GPT fallback。
+- 微批次：YOLO_BATCH_WINDOW_MS 內到達的影像合成一批，一次 predict，
+  再把每張的結果分回給各自等待的 request（早上尖峰大家同時上傳）；
+  送進 pool 的批次最多 YOLO_WORKERS 個，worker 忙的時候影像在佇列裡累積成下一批。
+
+部署：整台機器只該有一份模型、一個微批次。
+- 單一 web process（Dockerfile 的 runserver、gunicorn -w 1 --threads N）：
+  view 直接用本 process 的 pool。
+- 多個 web process（gunicorn -w N）：另外跑 `python manage.py yolo_server`，並設定
+  YOLO_SERVER_ADDRESS（unix socket 路徑）與 YOLO_SERVER_AUTHKEY；
+  web process 只把影像送過去，pool 與微批次都在 server 裡，
+  所有 worker 的請求一起湊批。
+- 沒設 YOLO_SERVER_ADDRESS 時，同一台機器只有拿到 YOLO_POOL_LOCK（flock）的 process
+  會建 pool，其他 process 直接丟 InferenceError（走 GPT fallback），不會變成 N 份模型。
+
+這個模組頂層刻意不 import Django / cv2 / ultralytics：spawn 出來的 worker
+會重新 import 本模組，必須保持輕量。
+"""
+import ipaddress
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.connection import Client, Listener
+
+try:
+    import fcntl
+except ImportError:  # Windows 開發機：不檢查
+    fcntl = None
+
+
+class InferenceError(Exception):
+    """推論沒有產出結果（逾時、忙碌、模型錯誤）"""
+
+
+# 數值驗證範圍
+VALID_RANGES = {
+    "systolic": (70, 250),
+    "diastolic": (40, 150),
+    "pulse": (30, 200),
+}
+
+
+# ---------- worker 端（在推論 process 內執行） ----------
+
+_REGION_MODEL = None
+_DIGITS_MODEL = None
+_DEVICE = "cpu"
+
+
+def _init_worker(region_path, digits_path, threads):
+    global _REGION_MODEL, _DIGITS_MODEL
+    # 每個推論 worker 只吃固定數量的 CPU thread，避免多個 worker 互搶
+    os.environ.setdefault("OMP_NUM_THREADS", str(threads))
+    from ultralytics import YOLO
+
+    _REGION_MODEL = YOLO(region_path)
+    _DIGITS_MODEL = YOLO(digits_path)
+
+
+def _region_key(cls_name):
+    name = cls_name.lower()
+    if "sys" in name:
+        return "systolic"
+    if "dia" in name:
+        return "diastolic"
+    if "pul" in name:
+        return "pulse"
+    return None
+
+
+def _best_regions(r):
+    """每個欄位（收縮/舒張/心跳）只留信心最高的框：{key: (x1, y1, x2, y2)}"""
+    best = {}
+    for b in getattr(r, "boxes", []):
+        key = _region_key(_REGION_MODEL.names.get(int(b.cls[0]), ""))
+        if key is None:
+            continue
+        conf = float(b.conf[0])
+        if key not in best or conf > best[key][0]:
+            best[key] = (conf, [int(v) for v in b.xyxy[0].tolist()])
+    return {k: xyxy for k, (_, xyxy) in best.items()}
+
+
+def _read_number(r):
+    """digits 模型的結果：框依 x 由左到右排，把數字類別接起來"""
+    boxes = sorted(getattr(r, "boxes", []), key=lambda b: float(b.xyxy[0][0]))
+    digits = "".join(
+        name for name in (str(_DIGITS_MODEL.names.get(int(b.cls[0]), "")) for b in boxes)
+        if name.isdigit()
+    )
+    return int(digits) if digits else None
+
+
+def _infer_batch(images):
+    """
+    在 worker 內對整批影像：region 偵測 → 裁切三個欄位 → digits 一次讀完所有裁切。
+    回傳與 images 同順序的 list[{systolic, diastolic, pulse}]；
+    讀不到或不在 VALID_RANGES 的欄位為 None（view 會改走 GPT fallback）。
+    """
+    det = _REGION_MODEL.predict(list(images), conf=0.40, verbose=False, device=_DEVICE)
+
+    results = [{"systolic": None, "diastolic": None, "pulse": None} for _ in images]
+    crops, owners = [], []
+    for i, (image, r) in enumerate(zip(images, det)):
+        h, w = image.shape[:2]
+        for key, (x1, y1, x2, y2) in _best_regions(r).items():
+            x1, y1 = max(x1, 0), max(y1, 0)
+            x2, y2 = min(x2, w), min(y2, h)
+            if x2 - x1 < 2 or y2 - y1 < 2:
+                continue
+            crops.append(image[y1:y2, x1:x2])
+            owners.append((i, key))
+
+    if crops:
+        digit_det = _DIGITS_MODEL.predict(crops, conf=0.25, verbose=False, device=_DEVICE)
+        for (i, key), r in zip(owners, digit_det):
+            value = _read_number(r)
+            lo, hi = VALID_RANGES[key]
+            if value is not None and lo <= value <= hi:
+                results[i][key] = value
+    return results
+
+
+# ---------- web 端（在 Django process 內執行） ----------
+
+_POOL = None
+_SLOTS = None
+_OWNER_LOCK = None
+_pool_lock = threading.Lock()
+
+
+def _claim_pool_owner(path):
+    """同一台機器只允許一個 process 持有本機推論 pool（flock；process 結束自動釋放）"""
+    global _OWNER_LOCK
+    if fcntl is None or _OWNER_LOCK is not None:
+        return True
+    f = open(path, "a")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return False
+    _OWNER_LOCK = f
+    return True
+
+
+def _get_pool():
+    global _POOL, _SLOTS
+    if _POOL is None:
+        with _pool_lock:
+            if _POOL is None:
+                from django.conf import settings
+
+                if not _claim_pool_owner(settings.YOLO_POOL_LOCK):
+                    raise InferenceError(
+                        "another process owns the YOLO pool; "
+                        "run `manage.py yolo_server` and set YOLO_SERVER_ADDRESS"
+                    )
+                workers = getattr(settings, "YOLO_WORKERS", 1)
+                models_dir = settings.YOLO_MODELS_DIR
+                _POOL = ProcessPoolExecutor(
+                    max_workers=workers,
+                    # spawn：不要把 web worker 的 thread / DB 連線 fork 進推論 process
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(
+                        os.path.join(models_dir, "region_best.pt"),
+                        os.path.join(models_dir, "digits_best.pt"),
+                        getattr(settings, "YOLO_THREADS_PER_WORKER", 1),
+                    ),
+                )
+                # 佇列上限：每個 worker 最多排 YOLO_QUEUE_PER_WORKER 張，再多就直接回忙碌
+                _SLOTS = threading.BoundedSemaphore(workers * getattr(settings, "YOLO_QUEUE_PER_WORKER", 16))
+    return _POOL, _SLOTS
+
+
+class _Batcher:
+    """
+    收集短時間內進來的影像，湊成一批送進 pool。
+    每張影像配一個 Future，批次完成後把結果逐一 set 回去。
+    同時送進 pool 的批次最多 max_in_flight（= worker 數）：worker 都在忙時不再切批，
+    影像留在佇列裡累積，等有 worker 空出來再一次帶走（最多 max_batch 張）。
+    """
+
+    def __init__(self, window_ms, max_batch, max_in_flight):
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.in_flight = threading.BoundedSemaphore(max_in_flight)
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="yolo-batcher", daemon=True)
+        self.thread.start()
+
+    def submit(self, image):
+        fut = Future()
+        self.queue.put((image, fut))
+        return fut
+
+    def _collect(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # 先等有空的 worker 再收集：忙的時候進來的影像會併成下一批
+            self.in_flight.acquire()
+            batch = self._collect()
+            # 已逾時被取消的就不送了
+            live = [(img, fut) for img, fut in batch if fut.set_running_or_notify_cancel()]
+            if not live:
+                self.in_flight.release()
+                continue
+            images = [img for img, _ in live]
+            waiters = [fut for _, fut in live]
+            try:
+                pool_future = _get_pool()[0].submit(_infer_batch, images)
+            except Exception as e:
+                self.in_flight.release()
+                for fut in waiters:
+                    fut.set_exception(e)
+                continue
+            pool_future.add_done_callback(lambda pf, waiters=waiters: self._fan_out(pf, waiters))
+
+    def _fan_out(self, pool_future, waiters):
+        self.in_flight.release()
+        try:
+            results = pool_future.result()
+        except Exception as e:
+            for fut in waiters:
+                fut.set_exception(e)
+            return
+        for fut, res in zip(waiters, results):
+            fut.set_result(res)
+
+
+_BATCHER = None
+
+
+def _get_batcher():
+    global _BATCHER
+    if _BATCHER is None:
+        with _pool_lock:
+            if _BATCHER is None:
+                from django.conf import settings
+
+                _BATCHER = _Batcher(
+                    getattr(settings, "YOLO_BATCH_WINDOW_MS", 5),
+                    getattr(settings, "YOLO_MAX_BATCH", 8),
+                    getattr(settings, "YOLO_WORKERS", 1),
+                )
+    return _BATCHER
+
+
+def detect_readings(image, timeout=None):
+    """
+    把解碼後的影像送去推論，回傳 {systolic, diastolic, pulse}。
+    有設 YOLO_SERVER_ADDRESS 就送到 yolo_server，否則用本 process 的 pool（經微批次）。
+    失敗一律丟 InferenceError。
+    """
+    from django.conf import settings
+
+    if timeout is None:
+        timeout = getattr(settings, "YOLO_TIMEOUT", 10)
+
+    address = parse_address(getattr(settings, "YOLO_SERVER_ADDRESS", ""))
+    if address is not None:
+        return _detect_remote(address, image, timeout)
+    return _detect_local(image, timeout)
+
+
+def _detect_local(image, timeout):
+    _, slots = _get_pool()
+    if not slots.acquire(blocking=False):
+        raise InferenceError("inference queue full")
+    future = _get_batcher().submit(image)
+    # 名額等這張影像真的推論完才歸還（逾時的工作仍佔著 worker）
+    future.add_done_callback(lambda _f: slots.release())
+
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeout:
+        future.cancel()
+        raise InferenceError(f"inference timeout ({timeout}s)")
+    except BrokenProcessPool as e:
+        # worker 掛了（例如模型檔不存在）：丟掉這個 pool，下次重建
+        shutdown()
+        raise InferenceError(f"inference pool broken: {e}")
+    except Exception as e:
+        raise InferenceError(f"{type(e).__name__}: {e}")
+
+
+def shutdown():
+    global _POOL, _SLOTS
+    with _pool_lock:
+        if _POOL is not None:
+            _POOL.shutdown(wait=False, cancel_futures=True)
+        _POOL, _SLOTS = None, None
+
+
+# ---------- 共用推論 server（manage.py yolo_server） ----------
+
+def parse_address(raw):
+    """'host:port' → (host, port)；其他非空字串當 unix socket 路徑；空字串回 None"""
+    if not raw:
+        return None
+    host, sep, port = raw.rpartition(":")
+    if sep and port.isdigit():
+        return (host, int(port))
+    return raw
+
+
+def is_loopback(address):
+    """unix socket 或 127.0.0.1 / ::1 / localhost 的 TCP 位址"""
+    if isinstance(address, str):
+        return True
+    host = address[0]
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _authkey():
+    """
+    連線收到的東西會被 unpickle：沒設 YOLO_SERVER_AUTHKEY 就不連、不聽，
+    不退回 SECRET_KEY（repo 裡那把是公開的）。
+    """
+    from django.conf import settings
+
+    key = getattr(settings, "YOLO_SERVER_AUTHKEY", "")
+    if not key:
+        raise InferenceError("YOLO_SERVER_AUTHKEY is not set")
+    return key.encode()
+
+
+_client = threading.local()
+
+
+def _drop_connection():
+    conn = getattr(_client, "conn", None)
+    _client.conn = None
+    if conn is not None:
+        conn.close()
+
+
+def _detect_remote(address, image, timeout):
+    """web 端：每個 thread 一條到 yolo_server 的連線，一問一答"""
+    authkey = _authkey()
+    try:
+        conn = getattr(_client, "conn", None)
+        if conn is None:
+            conn = _client.conn = Client(address, authkey=authkey)
+        conn.send((image, timeout))
+        # server 自己也會在 timeout 後回錯誤，多等一秒給傳輸
+        if not conn.poll(timeout + 1):
+            # 晚到的回覆會跟下一張對不上，連線直接丟掉
+            _drop_connection()
+            raise InferenceError(f"inference timeout ({timeout}s)")
+        ok, payload = conn.recv()
+    except (OSError, EOFError, multiprocessing.AuthenticationError) as e:
+        _drop_connection()
+        raise InferenceError(f"inference server unavailable: {e}")
+    if not ok:
+        raise InferenceError(payload)
+    return payload
+
+
+def _serve_connection(conn):
+    with conn:
+        while True:
+            try:
+                image, timeout = conn.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                reply = (True, _detect_local(image, timeout))
+            except InferenceError as e:
+                reply = (False, str(e))
+            try:
+                conn.send(reply)
+            except OSError:
+                return
+
+
+def serve(address):
+    """
+    yolo_server 的本體：先建好 pool（載入模型），再接 web process 的連線；
+    每條連線一個 thread，全部共用這個 process 的 pool、名額與微批次。
+    位址與 authkey 的檢查在 management command（yolo_server）裡做。
+    """
+    authkey = _authkey()
+    _get_pool()   # 同時拿到 YOLO_POOL_LOCK：同一台機器不會有第二個 server
+    if isinstance(address, str) and os.path.exists(address):
+        # 上一次沒正常結束留下的 socket 檔
+        os.unlink(address)
+    # backlog 預設只有 1：多個 web worker 同時連上來會被 kernel 丟掉、卡在握手
+    listener = Listener(address, backlog=64, authkey=authkey)
+    try:
+        while True:
+            try:
+                conn = listener.accept()
+            except (OSError, multiprocessing.AuthenticationError):
+                continue
+            threading.Thread(target=_serve_connection, args=(conn,), name="yolo-conn", daemon=True).start()
+    finally:
+        listener.close()
+        shutdown()
@@ -0,0 +1,437 @@
+# mysite/services/call_ingest.py
+"""
+通話紀錄匯入：長者手機第一次同步時可能有好幾千筆，一次請求就要全部收下，不能截斷。
+
+- iter_records()：從 request 串流邊讀邊解析 JSON 陣列或 NDJSON，不必把整個 body 載進記憶體
+- ingest()：每 CALL_INGEST_CHUNK 筆一批：normalize_batch() 整批逐欄正規化 → 批內去重 →
+  INSERT IGNORE（與 bulk_create(ignore_conflicts=True) 同一句 SQL，rowcount 就是實際新增的筆數）
+- 去重交給 DB 的唯一鍵 (UserId, Phone, PhoneTime)：寫入前不必查已存在的紀錄，
+  同時上傳也不會重複（INSERT IGNORE / ON CONFLICT DO NOTHING）
+- 每批各自 commit；帶 upload_id 時把進度寫進快取，連線中斷後用同一個 upload_id 重送，
+  會跳過已經 commit 的筆數（續傳）。就算快取沒有進度（重啟、不同 worker）從頭再送也只會被去重掉
+"""
+import codecs
+import json
+import re
+from datetime import datetime, timezone as py_tz
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router, transaction
+from django.db.models.constants import OnConflict
+from django.db.models.sql import InsertQuery
+from django.utils import timezone as dj_tz
+
+from mysite.models import CallRecord
+from mysite.services.timeparse import parse_timestamp
+
+_READ_SIZE = 64 * 1024
+_MAX_VALUE_CHARS = 1024 * 1024    # 單筆 JSON 的上限：超過就當格式錯誤，不會一直讀到 body 結尾
+_NUMBER_CHARS = frozenset("0123456789+-.eE")
+_AFTER_VALUE = frozenset(" \t\r\n,]")
+_PROGRESS_TTL = 60 * 60 * 24      # 續傳進度保留一天（秒）
+
+
+class IngestError(Exception):
+    """上傳內容無法解析（已經 commit 的批次仍然有效，可用 upload_id 續傳）"""
+
+
+def chunk_size():
+    return getattr(settings, "CALL_INGEST_CHUNK", 500)
+
+
+# ---------- 欄位正規化 ----------
+
+_NON_DIGIT = re.compile(r'\D')
+
+_STATUSES = ('INCOMING', 'OUTGOING', 'MISSED', 'REJECTED', 'BLOCKED', 'VOICEMAIL', 'ANSWERED_EXTERNALLY', 'UNKNOWN')
+# 英文字面 + 數字（Android CallLog.Calls.TYPE）+ 常見錯字 → 標準型別
+_STATUS_BY_TOKEN = {
+    **{s: s for s in _STATUSES},
+    '1': 'INCOMING', '2': 'OUTGOING', '3': 'MISSED',
+    '4': 'VOICEMAIL',            # 4 是語音信箱
+    '5': 'REJECTED', '6': 'BLOCKED', '7': 'ANSWERED_EXTERNALLY',
+    'UNKNOW': 'UNKNOWN',         # 有些資料表預設寫錯字
+}
+
+def normalize_phone(p: str) -> str:
+    """去除非數字；+886 開頭轉成 0 開頭"""
+    s = p or ''
+    if not s.isdigit():
+        s = _NON_DIGIT.sub('', s)
+    if s.startswith('886') and len(s) >= 11:
+        s = '0' + s[3:]
+    return s
+
+def to_dt(obj) -> datetime:
+    """把各種輸入轉成『UTC aware、分鐘精度』的 datetime；解析不了就用現在"""
+    return parse_timestamp(obj, minute=True) or dj_tz.now().astimezone(py_tz.utc).replace(second=0, microsecond=0)
+
+def map_type(t) -> str:
+    """容錯數字/字串；回傳標準型別字串"""
+    if t is None:
+        return 'UNKNOWN'
+    return _STATUS_BY_TOKEN.get(str(t).strip().upper(), 'UNKNOWN')
+
+
+def _resolve_fields():
+    """讀模型欄位，用動態對應避免命名差異（模組載入時做一次）"""
+    model_fields = {f.name for f in CallRecord._meta.get_fields() if hasattr(f, "attname")}
+    def pick_field(cands):
+        for c in cands:
+            if c in model_fields:
+                return c
+        return None
+
+    return {
+        "phone":    pick_field(["Phone", "phone"]),
+        "time":     pick_field(["PhoneTime", "phone_time", "time", "Timestamp"]),
+        "user":     pick_field(["UserId", "user", "user_id"]),
+        "duration": pick_field(["duration_sec","DurationSec","Duration","duration","CallDuration","Seconds","Secs"]),
+        "type":     pick_field(["status","Status","Type","type","CallType","Direction"]),  # 支援 status/Type
+        "name":     pick_field(["PhoneName","phone_name","Name","ContactName"]),
+        "extra":    pick_field(["Extra","extra","Meta","Payload"]),
+    }
+
+FIELDS = _resolve_fields()
+
+# 手機端各種 key → 欄位；同一欄有好幾個 key 都有值時，取排在前面的
+_ALIASES = {
+    "phone":    ("phone", "Phone"),
+    "time":     ("timestamp", "PhoneTime", "time"),
+    "type":     ("type", "status", "Type", "CallType", "Direction", "rawType"),
+    "duration": ("duration_sec", "DurationSec", "Duration", "duration", "CallDuration", "Seconds", "Secs"),
+    "name":     ("name", "PhoneName"),
+    "extra":    ("extra",),
+}
+_KEY_TABLE = {key: (col, rank) for col, keys in _ALIASES.items() for rank, key in enumerate(keys)}
+
+
+def _key_plan(keys):
+    """一組 key → [(欄位, 依優先序排好的 key, ...), ...]；同一支 App 送來的 key 組合都一樣，一批只算幾次"""
+    present = {}
+    for k in keys:
+        hit = _KEY_TABLE.get(k)
+        if hit is not None:
+            present.setdefault(hit[0], []).append((hit[1], k))
+    return [(col, tuple(k for _rank, k in sorted(ks))) for col, ks in present.items()]
+
+
+def _columns(records):
+    """紀錄 list → 各欄一個 list（同樣長度；沒有值的是 None）"""
+    cols = {col: [None] * len(records) for col in _ALIASES}
+    plans = {}
+    for i, r in enumerate(records):
+        if not isinstance(r, dict):
+            continue
+        keys = tuple(r)
+        plan = plans.get(keys)
+        if plan is None:
+            plan = plans[keys] = [(cols[col], col == "extra", ks) for col, ks in _key_plan(keys)]
+        for column, keep_falsy, ks in plan:
+            for k in ks:
+                v = r[k]
+                if v or keep_falsy:
+                    column[i] = v
+                    break
+    return cols
+
+
+def normalize_batch(records, target_user):
+    """
+    一批手機端紀錄 → CallRecord 欄位 dict 的 list（缺電話的略過），以及略過的筆數。
+    一欄一欄處理：電話、型別重複的值只算一次，時間走 timeparse 的快速路徑。
+    """
+    records = records if isinstance(records, list) else list(records)
+    cols = _columns(records)
+    n = len(records)
+
+    # ---- 電話：同一支號碼只正規化一次 ----
+    phone_memo = {}
+    phones = []
+    for raw in cols["phone"]:
+        if raw is None:
+            phones.append('')
+            continue
+        raw = str(raw)
+        p = phone_memo.get(raw)
+        if p is None:
+            p = phone_memo[raw] = normalize_phone(raw)
+        phones.append(p)
+
+    # ---- 時間：解析不了的用現在（整批同一個值） ----
+    now_minute = dj_tz.now().astimezone(py_tz.utc).replace(second=0, microsecond=0)
+    times = [parse_timestamp(v, minute=True) or now_minute for v in cols["time"]]
+
+    # ---- 型別：沒有 type 類 key 時看 extra.rawType；相同寫法只對照一次 ----
+    type_memo = {}
+    types = []
+    for raw, extra in zip(cols["type"], cols["extra"]):
+        if raw is None and isinstance(extra, dict):
+            raw = extra.get("rawType")
+        key = raw if type(raw) is str else str(raw)      # map_type 只看 str(raw)
+        t = type_memo.get(key)
+        if t is None:
+            t = type_memo[key] = map_type(raw)
+        types.append(t)
+
+    # ---- 時長 ----
+    durations = []
+    for raw in cols["duration"]:
+        if raw is None or type(raw) is int:
+            durations.append(max(raw or 0, 0))
+            continue
+        try:
+            durations.append(max(int(raw), 0))
+        except (TypeError, ValueError):
+            durations.append(0)
+
+    # ---- 名稱 ----
+    names = [(str(v).strip() if v is not None else '')[:50] or '未知來電' for v in cols["name"]]
+
+    f_user, f_phone, f_time = FIELDS["user"], FIELDS["phone"], FIELDS["time"]
+    f_type, f_duration, f_name, f_extra = FIELDS["type"], FIELDS["duration"], FIELDS["name"], FIELDS["extra"]
+    rows = []
+    for i in range(n):
+        if not phones[i]:
+            continue
+        payload = {f_user: target_user, f_phone: phones[i], f_time: times[i]}
+        if f_type:     payload[f_type] = types[i]
+        if f_duration: payload[f_duration] = durations[i]
+        if f_name:     payload[f_name] = names[i]
+        if f_extra and cols["extra"][i] is not None:
+            payload[f_extra] = cols["extra"][i]
+        rows.append(payload)
+    return rows, n - len(rows)
+
+
+# ---------- 串流解析 ----------
+
+def _text_chunks(stream):
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    while True:
+        data = stream.read(_READ_SIZE)
+        if not data:
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                yield tail
+            return
+        yield decoder.decode(data)
+
+
+def iter_json_array(stream):
+    """
+    邊讀邊解析最外層的 JSON 陣列，一次吐一個元素。
+    記憶體只留目前讀到、還沒解析完的那一段。
+    """
+    decoder = json.JSONDecoder()
+    chunks = _text_chunks(stream)
+    buf, pos, eof = "", 0, False
+
+    def fill():
+        nonlocal buf, pos, eof
+        try:
+            buf = buf[pos:] + next(chunks)
+        except StopIteration:
+            buf, eof = buf[pos:], True
+        pos = 0
+
+    def skip_ws():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos].isspace():
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            fill()
+
+    def need_more():
+        if len(buf) - pos > _MAX_VALUE_CHARS:
+            raise IngestError("JSON 格式錯誤：單筆資料過大")
+        fill()
+
+    def next_value():
+        nonlocal pos
+        while True:
+            skip_ws()
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                # 只有錯在 buffer 尾端（字串、true、\uXXXX 還沒讀完）才可能是切在一半，補資料再試；
+                # 錯在中間就是真的格式錯誤，直接停，不必一路讀到最後
+                if eof or not _maybe_truncated(e, len(buf)):
+                    raise IngestError(f"JSON 格式錯誤：{e.msg}")
+                need_more()
+                continue
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                # 數字沒有結束符號："1." 會被解析成 1。後面接的只有數字字元（或什麼都沒有）就再讀
+                tail = end
+                while tail < len(buf) and buf[tail] in _NUMBER_CHARS:
+                    tail += 1
+                if tail == len(buf) and not eof:
+                    need_more()
+                    continue
+                if end < len(buf) and buf[end] not in _AFTER_VALUE:
+                    raise IngestError("JSON 格式錯誤：數字格式錯誤")
+            pos = end
+            return value
+
+    skip_ws()
+    if buf[pos:pos + 1] == "\ufeff":
+        pos += 1
+        skip_ws()
+    if buf[pos:pos + 1] != "[":
+        raise IngestError("body 必須是 JSON 陣列")
+    pos += 1
+    skip_ws()
+    if buf[pos:pos + 1] == "]":
+        return
+
+    while True:
+        yield next_value()
+        skip_ws()
+        sep = buf[pos:pos + 1]
+        pos += 1
+        if sep == "]":
+            return
+        if sep != ",":
+            raise IngestError("JSON 陣列不完整" if not sep else "JSON 格式錯誤")
+
+
+def _maybe_truncated(error, length):
+    """raw_decode 的錯誤是不是因為 buffer 在值的中間結束（再讀一段可能就對了）"""
+    # 未結束的字串從開頭的引號起算；其他（true / null 讀一半、\uXXXX 讀一半、少了逗號）錯在最後幾個字
+    return error.msg.startswith("Unterminated string") or length - error.pos <= 5
+
+
+def iter_ndjson(stream):
+    """一行一筆 JSON（空行略過）"""
+    pending = ""
+    for text in _text_chunks(stream):
+        pending += text
+        if pending.startswith("\ufeff"):
+            pending = pending[1:]
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            if line.strip():
+                yield _loads_line(line)
+    if pending.strip():
+        yield _loads_line(pending)
+
+
+def _loads_line(line):
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as e:
+        raise IngestError(f"NDJSON 格式錯誤：{e.msg}")
+
+
+def iter_records(stream, content_type=""):
+    """Content-Type 為 application/x-ndjson（或 jsonlines）時逐行解析，否則當作 JSON 陣列"""
+    ct = (content_type or "").split(";")[0].strip().lower()
+    if ct in ("application/x-ndjson", "application/ndjson", "application/jsonlines", "application/x-jsonlines"):
+        return iter_ndjson(stream)
+    return iter_json_array(stream)
+
+
+# ---------- 續傳進度 ----------
+
+def _progress_key(user_id, upload_id):
+    return f"call_ingest:{user_id}:{upload_id}"
+
+
+def get_progress(user_id, upload_id):
+    return cache.get(_progress_key(user_id, upload_id))
+
+
+def _save_progress(user_id, upload_id, stats, done=False):
+    if upload_id:
+        cache.set(_progress_key(user_id, upload_id), {**stats, "done": done}, _PROGRESS_TTL)
+
+
+# ---------- 寫入 ----------
+
+def _insert_ignore(objs):
+    """
+    bulk_create(ignore_conflicts=True) 一樣的 SQL（INSERT IGNORE / ON CONFLICT DO NOTHING），
+    但自己執行以拿到 cursor.rowcount＝實際新增的筆數（被唯一鍵略過的不算），不必另外查詢。
+    """
+    opts = CallRecord._meta
+    fields = [f for f in opts.concrete_fields if f is not opts.pk]
+    db = router.db_for_write(CallRecord)
+    conn = connections[db]
+    batch = conn.ops.bulk_batch_size(fields, objs) or len(objs)
+    inserted = 0
+    with conn.cursor() as cursor:
+        for i in range(0, len(objs), batch):
+            query = InsertQuery(CallRecord, on_conflict=OnConflict.IGNORE)
+            query.insert_values(fields, objs[i:i + batch])
+            for sql, params in query.get_compiler(using=db).as_sql():
+                cursor.execute(sql, params)
+                inserted += max(cursor.rowcount, 0)
+    return inserted
+
+
+def _write_chunk(rows):
+    """
+    批內去重後一次 INSERT，已經在 DB 的由唯一鍵略過，不另外查詢。
+    回傳 (批內不重複的筆數, 實際新增的筆數)
+    """
+    unique = {}
+    for d in rows:
+        unique.setdefault((d[FIELDS["phone"]], d[FIELDS["time"]]), d)
+    if not unique:
+        return 0, 0
+    with transaction.atomic():
+        inserted = _insert_ignore([CallRecord(**d) for d in unique.values()])
+    return len(unique), inserted
+
+
+def ingest(target_user, records, upload_id=None):
+    """
+    records：任何可迭代的手機端紀錄（list 或 iter_records() 的 generator）。
+    帶 upload_id 且快取裡有未完成的進度時，跳過前面已經處理過的筆數。
+    回傳 {"processed", "saved", "existing", "duplicates", "invalid", "resumed_from"}：
+    saved＝這次實際新增的筆數，existing＝原本就在 DB 的筆數，duplicates＝同一次上傳裡重複的筆數；
+    解析失敗丟 IngestError，e.stats 是到失敗為止的進度。
+    """
+    size = chunk_size()
+
+    stats = {"processed": 0, "saved": 0, "existing": 0, "duplicates": 0, "invalid": 0}
+    prev = get_progress(target_user.pk, upload_id) if upload_id else None
+    if prev and not prev.get("done"):
+        stats.update({k: prev.get(k, 0) for k in stats})
+    resumed_from = stats["processed"]
+    stats["resumed_from"] = resumed_from
+
+    def flush(raw):
+        rows, invalid = normalize_batch(raw, target_user)
+        unique, inserted = _write_chunk(rows)
+        stats["processed"] += len(raw)
+        stats["invalid"] += invalid
+        stats["saved"] += inserted
+        stats["existing"] += unique - inserted
+        stats["duplicates"] += len(rows) - unique
+        _save_progress(target_user.pk, upload_id, stats)
+
+    raw, seen = [], 0
+    try:
+        for r in records:
+            seen += 1
+            if seen <= resumed_from:
+                continue
+            raw.append(r)
+            if len(raw) >= size:
+                flush(raw)
+                raw = []
+        if raw:
+            flush(raw)
+    except IngestError as e:
+        e.stats = dict(stats)
+        raise
+
+    _save_progress(target_user.pk, upload_id, stats, done=True)
+    print(f"[call_ingest] user={target_user.pk} upload={upload_id or '-'} "
+          f"processed={stats['processed']} saved={stats['saved']} existing={stats['existing']} "
+          f"duplicates={stats['duplicates']} invalid={stats['invalid']} resumed_from={resumed_from}")
+    return stats
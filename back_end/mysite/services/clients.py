@@ -0,0 +1,78 @@
+# mysite/services/clients.py
+"""
+外部服務 client 登錄處：每個 process 只建一次，之後共用。
+
+- Google Vision：憑證解析、TLS、gRPC channel 只做一次，channel 保持連線
+- OpenAI：同一個 OpenAI() 物件共用 httpx 連線池（keep-alive）
+
+逾時與重試預算都集中在 settings（OPENAI_TIMEOUT / OPENAI_MAX_RETRIES /
+VISION_TIMEOUT / VISION_RETRY_DEADLINE），個別呼叫也可以覆寫。
+"""
+import threading
+
+from django.conf import settings
+
+from mysite.services.lazy_imports import LazyModule
+
+config = LazyModule("config")
+openai = LazyModule("openai")
+vision = LazyModule("google.cloud.vision")
+api_retry = LazyModule("google.api_core.retry")
+
+_CLIENTS = {}
+_lock = threading.Lock()
+
+
+def _get(name, factory):
+    client = _CLIENTS.get(name)
+    if client is None:
+        with _lock:
+            client = _CLIENTS.get(name)
+            if client is None:
+                client = _CLIENTS[name] = factory()
+    return client
+
+
+def _build_openai():
+    return openai.OpenAI(
+        api_key=getattr(settings, "OPENAI_API_KEY", None),
+        timeout=getattr(settings, "OPENAI_TIMEOUT", 30),
+        max_retries=getattr(settings, "OPENAI_MAX_RETRIES", 2),
+    )
+
+
+def _build_vision():
+    return vision.ImageAnnotatorClient.from_service_account_info(config.GOOGLE_VISION_CREDENTIALS)
+
+
+def openai_client(timeout=None, max_retries=None):
+    """共用的 OpenAI client；有給 timeout / max_retries 時回傳共用連線池的副本"""
+    client = _get("openai", _build_openai)
+    overrides = {}
+    if timeout is not None:
+        overrides["timeout"] = timeout
+    if max_retries is not None:
+        overrides["max_retries"] = max_retries
+    return client.with_options(**overrides) if overrides else client
+
+
+def vision_client():
+    return _get("vision", _build_vision)
+
+
+def vision_call_options(timeout=None, retry_deadline=None):
+    """Vision 每次呼叫要帶的 timeout / retry（暫時性錯誤才重試，總時間不超過 retry_deadline）"""
+    if timeout is None:
+        timeout = getattr(settings, "VISION_TIMEOUT", 15)
+    if retry_deadline is None:
+        retry_deadline = getattr(settings, "VISION_RETRY_DEADLINE", 30)
+    return {
+        "timeout": timeout,
+        "retry": api_retry.Retry(initial=0.5, maximum=4.0, multiplier=2.0, timeout=retry_deadline),
+    }
+
+
+def reset():
+    """丟掉所有 client（例如 fork 之後，gRPC channel 不能跨 process 共用）"""
+    with _lock:
+        _CLIENTS.clear()
@@ -0,0 +1,80 @@
+# mysite/services/doses.py
+"""
+服藥記錄：長者與家人可能同時按「已服藥」，整批在一個 transaction 內處理。
+
+- select_for_update 鎖住這位長者要記錄的藥，CurrentDosage 用 F() 在 DB 端 +1
+- 吃完的藥不再刪除，只標 FinishedAt（提醒與藥單列表會略過）
+- 每一次服藥寫一筆 DoseLog（只新增），之後可以算遵從度
+- 不管幾種藥都是固定 3 次查詢：鎖定讀取、UPDATE、bulk INSERT
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from mysite.models import DoseLog, Med
+from mysite.services import reminder_occurrences
+
+
+class MedNotFound(Exception):
+    def __init__(self, names):
+        super().__init__(", ".join(names))
+        self.names = names
+
+
+def record_doses(user_id, med_names, recorded_by=None):
+    """
+    med_names 裡每出現一次就記一次服藥。
+    同名的藥有好幾張藥單時，依 MedId 由舊到新各記一次（出現兩次就記兩張）。
+    有任何藥名找不到就丟 MedNotFound，整批不寫入。
+    """
+    wanted = Counter(str(n) for n in med_names)
+    now = timezone.now()
+
+    with transaction.atomic():
+        # 不在 SQL 裡 ORDER BY MedId：那樣 optimizer 會改走 UserID 的索引（順便免排序），
+        # 不走 idx_med_user_name；同一位長者的藥只有幾筆，在 Python 排就好
+        meds = sorted(
+            Med.objects.select_for_update()
+            .filter(UserID_id=user_id, MedName__in=wanted.keys(), FinishedAt__isnull=True)
+            .only("MedId", "MedName", "PrescriptionID", "TotalDosage", "CurrentDosage", "FinishedAt"),
+            key=lambda med: med.MedId,
+        )
+
+        by_name = {}
+        for med in meds:
+            by_name.setdefault(med.MedName, []).append(med)
+        missing = [name for name in wanted if name not in by_name]
+        if missing:
+            raise MedNotFound(missing)
+
+        picked = []
+        for name, count in wanted.items():
+            picked.extend(by_name[name][:count])
+
+        finished_ids = []
+        for med in picked:
+            med.CurrentDosage += 1
+            if med.TotalDosage > 0 and med.CurrentDosage >= med.TotalDosage:
+                med.FinishedAt = now
+                finished_ids.append(med.MedId)
+
+        updates = {"CurrentDosage": F("CurrentDosage") + 1}
+        if finished_ids:
+            updates["FinishedAt"] = Case(When(pk__in=finished_ids, then=Value(now)), default=F("FinishedAt"))
+        Med.objects.filter(pk__in=[m.MedId for m in picked]).update(**updates)
+        DoseLog.objects.bulk_create([
+            DoseLog(
+                UserID_id=user_id, MedID_id=med.MedId, MedName=med.MedName,
+                PrescriptionID=med.PrescriptionID, DoseNumber=med.CurrentDosage,
+                TotalDosage=med.TotalDosage, RecordedBy=recorded_by, TakenAt=now,
+            )
+            for med in picked
+        ])
+
+        if finished_ids:
+            # QuerySet.update 不會發 post_save：吃完的藥要從時段表 / 提醒裡拿掉
+            reminder_occurrences.schedule_changed_on_commit(user_id)
+
+    return picked
@@ -0,0 +1,89 @@
+# mysite/services/image_prep.py
+"""
+上傳影像前處理：手機原圖動輒 12MP，這裡盡量少配置記憶體。
+
+- 原始位元組只包成 memoryview，不另外複製
+- 先從 JPEG/PNG 標頭讀出寬高，用 IMREAD_REDUCED_COLOR_{2,4,8} 直接以縮小倍率解碼，
+  剩下的差距再 resize 到 settings.IMAGE_MAX_SIDE
+- GPT fallback 需要的 base64 只有真的用到時才產生，而且是用縮小後的影像重新壓 JPEG
+"""
+import base64
+import struct
+from functools import cached_property
+
+from django.conf import settings
+
+from mysite.services.lazy_imports import LazyModule
+
+cv2 = LazyModule("cv2")
+np = LazyModule("numpy")
+
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def image_size(buf):
+    """只看標頭取得 (寬, 高)；不認得的格式回 None"""
+    if buf[:8] == b"\x89PNG\r\n\x1a\n" and len(buf) >= 24:
+        w, h = struct.unpack(">II", buf[16:24])
+        return w, h
+    if buf[:2] == b"\xff\xd8":
+        i, n = 2, len(buf)
+        while i + 9 < n:
+            if buf[i] != 0xFF:
+                i += 1
+                continue
+            marker = buf[i + 1]
+            if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7 or marker == 0xFF:
+                i += 1 if marker == 0xFF else 2
+                continue
+            seg_len = struct.unpack(">H", buf[i + 2:i + 4])[0]
+            if marker in _JPEG_SOF:
+                h, w = struct.unpack(">HH", buf[i + 5:i + 9])
+                return w, h
+            i += 2 + seg_len
+    return None
+
+
+def _reduced_flag(size, max_side):
+    """挑最大的縮小倍率，但解出來的長邊仍 >= max_side"""
+    if size is None:
+        return cv2.IMREAD_COLOR
+    long_side = max(size)
+    for factor, flag in ((8, cv2.IMREAD_REDUCED_COLOR_8),
+                         (4, cv2.IMREAD_REDUCED_COLOR_4),
+                         (2, cv2.IMREAD_REDUCED_COLOR_2)):
+        if long_side // factor >= max_side:
+            return flag
+    return cv2.IMREAD_COLOR
+
+
+class PreparedImage:
+    """raw：原始位元組（memoryview）；image：縮小後的 BGR ndarray"""
+
+    def __init__(self, raw, image):
+        self.raw = raw
+        self.image = image
+
+    @cached_property
+    def jpeg_b64(self):
+        """給 GPT fallback 用：縮小後的影像重新壓 JPEG 再 base64，第一次讀取才計算"""
+        ok, enc = cv2.imencode(".jpg", self.image, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        if not ok:
+            return base64.b64encode(self.raw).decode("utf-8")
+        return base64.b64encode(enc).decode("utf-8")
+
+
+def prepare_image(image_bytes, max_side=None):
+    if max_side is None:
+        max_side = getattr(settings, "IMAGE_MAX_SIDE", 1280)
+
+    raw = memoryview(image_bytes)
+    img = cv2.imdecode(np.frombuffer(raw, np.uint8), _reduced_flag(image_size(raw), max_side))
+    if img is None:
+        raise ValueError("decode_failed")
+
+    h, w = img.shape[:2]
+    if max(h, w) > max_side:
+        scale = max_side / max(h, w)
+        img = cv2.resize(img, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+    return PreparedImage(raw, img)
@@ -0,0 +1,54 @@
+# mysite/services/lazy_imports.py
+"""
+重量級相依（YOLO / OpenCV / numpy / Google Vision / OpenAI）延遲載入。
+
+views 在模組頂層只拿到一個代理物件，第一次存取屬性時才真正 import，
+所以只服務 /api/ping/、登入、定位的 worker 不會付出載入這些套件的代價。
+"""
+import importlib
+import threading
+import time
+
+# 已載入的重量級模組與花費秒數：{"cv2": 0.42, ...}（manage.py import_report 會列出 import 期間就載入的）
+LOAD_TIMES = {}
+
+_lock = threading.Lock()
+
+
+class LazyModule:
+    """
+    用法：
+        cv2 = LazyModule("cv2")
+        cv2.imdecode(...)          # ← 這一刻才 import cv2
+    on_load：第一次載入後呼叫一次（例如設定 openai.api_key）
+    """
+
+    def __init__(self, name, on_load=None):
+        self.__dict__["_name"] = name
+        self.__dict__["_on_load"] = on_load
+        self.__dict__["_module"] = None
+
+    def _resolve(self):
+        mod = self.__dict__["_module"]
+        if mod is not None:
+            return mod
+        with _lock:
+            mod = self.__dict__["_module"]
+            if mod is None:
+                t0 = time.perf_counter()
+                mod = importlib.import_module(self._name)
+                LOAD_TIMES.setdefault(self._name, time.perf_counter() - t0)
+                if self._on_load is not None:
+                    self._on_load(mod)
+                self.__dict__["_module"] = mod
+        return mod
+
+    def __getattr__(self, attr):
+        return getattr(self._resolve(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._resolve(), attr, value)
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_module"] is not None else "not loaded"
+        return f"<LazyModule {self._name} ({state})>"
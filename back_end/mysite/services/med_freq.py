@@ -0,0 +1,115 @@
+# mysite/services/med_freq.py
+"""
+用藥頻率解析：OCR / GPT 給的各種寫法 → 標準字串 + 結構化資訊。
+
+- 所有規則合成一條預先編譯的 regex，一次 finditer 掃完，再依優先順序挑結果
+  （xNxD > 一天N次（N 大者優先）> 睡前 > 必要時），與原本逐條 re.search 的判斷一致
+- 同一種寫法會重複出現很多次（每張藥單、每次排提醒），結果用 lru_cache 記住
+- parse_freq 回傳 FreqInfo，排程（早/中/晚/睡前）與總劑量推算都從這裡拿，不要再各自比對中文字串
+
+    python manage.py bench_freq      # 與舊版逐條 re.search 比較
+"""
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+# 允許的頻率（與 Prompt 對齊）
+ALLOWED_FREQ = {"一天一次", "一天兩次", "一天三次", "一天四次", "睡前", "必要時", "未知"}
+
+_BY_COUNT = {1: "一天一次", 2: "一天兩次", 3: "一天三次", 4: "一天四次"}
+
+# 標準字串 → 每天幾次、排在哪些時段（對應 MedTimeSetting 的 早/中/晚/睡前）
+_RULES = {
+    "一天一次": (1, ("morning",)),
+    "一天兩次": (2, ("morning", "noon")),
+    "一天三次": (3, ("morning", "noon", "evening")),
+    "一天四次": (4, ("morning", "noon", "evening", "bedtime")),
+    "睡前": (1, ("bedtime",)),
+    "必要時": (None, ()),
+    "未知": (None, ()),
+}
+
+# 全形 / 乘號統一成 x，順便去掉空白
+_TRANS = str.maketrans({"Ｘ": "x", "＊": "x", "×": "x", "：": ":", "／": "/"})
+
+_FREQ_RE = re.compile(
+    r"""
+      x(?P<xn>\d)x(?P<xd>\d+)           # x3x7：一天 3 次、7 天
+    | (?:一天|每日)(?P<dn>[1-4])次       # 一天3次 / 每日 3 次
+    | (?P<sn>[1-4])次/日                 # 3次/日
+    | (?P<bed>睡前|睡覺前)
+    | (?P<prn>必要時|PRN)
+    | (?P<days>\d+)天                    # 7天（只用來推算總劑量）
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+
+class FreqInfo(NamedTuple):
+    label: str                  # ALLOWED_FREQ 之一
+    times_per_day: int | None   # 必要時 / 未知 為 None
+    days: int | None            # 寫法裡帶的天數（x3x7 的 7、「7天」），沒有就 None
+    prn: bool                   # 必要時
+    slots: tuple                # 排程時段，例如 ("morning", "noon")
+
+    @property
+    def total_dosage(self):
+        """每天次數 × 天數；任一個不知道就是 None"""
+        if self.times_per_day and self.days:
+            return self.times_per_day * self.days
+        return None
+
+
+def _clean(text):
+    t = "".join(str(text).translate(_TRANS).split())
+    # 常見打字錯：xlx3 → x1x3
+    return t.replace("xlx", "x1x")
+
+
+def _pick(t):
+    """回傳 (標準字串, 天數)"""
+    best, best_rank, days = None, None, None
+    for m in _FREQ_RE.finditer(t):
+        g = m.lastgroup
+        if g == "xd":
+            # xNxD：最優先，天數就是 D；N 不在 1~4 視為未知（與舊版相同）
+            return _BY_COUNT.get(int(m.group("xn")), "未知"), int(m.group("xd"))
+        if g == "days":
+            days = days or int(m.group("days"))
+            continue
+        if g in ("dn", "sn"):
+            n = int(m.group(g))
+            rank, label = (1, -n), _BY_COUNT[n]
+        elif g == "bed":
+            rank, label = (2, 0), "睡前"
+        else:
+            rank, label = (3, 0), "必要時"
+        if best_rank is None or rank < best_rank:
+            best, best_rank = label, rank
+
+    if best is None and t in ALLOWED_FREQ:
+        # 有時 GPT 已經回正確字串，但含不可見空白
+        best = t
+    return best or "未知", days
+
+
+@lru_cache(maxsize=1024)
+def parse_freq(text: str | None) -> FreqInfo:
+    if not text:
+        label, days = "未知", None
+    else:
+        label, days = _pick(_clean(text))
+    times, slots = _RULES[label]
+    return FreqInfo(label, times, days, label == "必要時", slots)
+
+
+def normalize_freq(text: str | None) -> str:
+    """
+    把各種寫法正規化成 ALLOWED_FREQ 之一。
+    支援：
+    - x1/x2/x3/x4 (+ x?x? 後面的天數)
+    - 一天4次 / 每日 3 次 / 3次/日
+    - 睡前/睡覺前、必要時/PRN
+    - xlx3（視為 x1x3）
+    """
+    return parse_freq(text).label
@@ -0,0 +1,127 @@
+# mysite/services/med_schedule.py
+"""
+用藥時段表：把一位長者的 Med + MedTimeSetting 編成「一天裡哪個時段吃哪些藥」，
+所有提醒 API（get_med_reminders、get_med_reminders_by_userid、med_reminder_builder）共用。
+
+- 頻率 → 時段的對應只在 med_freq.parse_freq 定義一次
+- 編好的表放在 settings.CACHES["med_schedule"]，長者裝置輪詢時命中快取就不用查 DB
+- 已吃完（FinishedAt 有值）的藥不排
+- Med / MedTimeSetting 有存檔或刪除時（mysite/signals.py），以及 bulk_create 寫入藥單後，
+  呼叫 invalidate(user_id) 清掉該長者的表
+
+表的格式（可直接序列化）：
+    {
+        "has_setting": bool,          # 有沒有 MedTimeSetting
+        "has_meds": bool,
+        "slots": {"morning": {"time": "08:00:00" | None, "meds": [藥名, ...]}, ...},
+        "items": [[時段, "08:00:00", 藥名, 頻率, PrescriptionID, 疾病], ...],   # 只含有設定時間的時段
+    }
+"""
+from datetime import datetime, time as dtime, timedelta
+
+from django.core.cache import caches
+
+from mysite.models import Med, MedTimeSetting
+from mysite.services.med_freq import parse_freq
+
+SLOTS = ("morning", "noon", "evening", "bedtime")
+SLOT_FIELDS = {
+    "morning": "MorningTime",
+    "noon": "NoonTime",
+    "evening": "EveningTime",
+    "bedtime": "Bedtime",
+}
+
+_VERSION = 1               # 表的格式改變時 +1，舊快取自動失效
+_MED_FIELDS = ("UserID_id", "MedName", "DosageFrequency", "PrescriptionID", "Disease")
+
+
+def _cache():
+    return caches["med_schedule"]
+
+
+def _key(user_id):
+    return f"med_schedule:{user_id}"
+
+
+def compile_schedule(time_setting, meds):
+    """time_setting 可為 None；meds 為該長者的 Med（queryset 或 list）"""
+    times = {
+        slot: (str(getattr(time_setting, field)) if getattr(time_setting, field, None) else None)
+        for slot, field in SLOT_FIELDS.items()
+    }
+    slots = {slot: {"time": times[slot], "meds": []} for slot in SLOTS}
+    items = []
+    has_meds = False
+    for med in meds:
+        has_meds = True
+        for slot in parse_freq((med.DosageFrequency or "").strip()).slots:
+            slots[slot]["meds"].append(med.MedName)
+            if times[slot]:
+                items.append([slot, times[slot], med.MedName, med.DosageFrequency,
+                              str(med.PrescriptionID), med.Disease])
+
+    items.sort(key=lambda it: it[1])
+    return {
+        "has_setting": time_setting is not None,
+        "has_meds": has_meds,
+        "slots": slots,
+        "items": items,
+    }
+
+
+def get_schedule(user_id):
+    """快取命中 0 次查詢；沒命中 2 次（MedTimeSetting、Med）"""
+    schedule = _cache().get(_key(user_id), version=_VERSION)
+    if schedule is None:
+        time_setting = MedTimeSetting.objects.filter(UserID_id=user_id).first()
+        meds = Med.objects.filter(UserID_id=user_id, FinishedAt__isnull=True).only(*_MED_FIELDS)
+        schedule = compile_schedule(time_setting, meds)
+        _cache().set(_key(user_id), schedule, version=_VERSION)
+    return schedule
+
+
+def get_schedules(user_ids):
+    """
+    多位長者一起拿：{user_id: 表}。
+    不管幾個人，最多 2 次查詢（沒命中快取的人一次撈 MedTimeSetting、一次撈 Med）。
+    """
+    user_ids = list(user_ids)
+    keys = {_key(uid): uid for uid in user_ids}
+    hits = _cache().get_many(keys, version=_VERSION)
+    result = {keys[k]: v for k, v in hits.items()}
+
+    missing = [uid for uid in user_ids if uid not in result]
+    if missing:
+        # MedTimeSetting 每人唯一（uniq_medtimesetting_user）
+        settings_by_user = {ts.UserID_id: ts for ts in MedTimeSetting.objects.filter(UserID_id__in=missing)}
+        meds_by_user = {uid: [] for uid in missing}
+        for med in Med.objects.filter(UserID_id__in=missing, FinishedAt__isnull=True).only(*_MED_FIELDS):
+            meds_by_user[med.UserID_id].append(med)
+
+        compiled = {
+            uid: compile_schedule(settings_by_user.get(uid), meds_by_user[uid])
+            for uid in missing
+        }
+        _cache().set_many({_key(uid): v for uid, v in compiled.items()}, version=_VERSION)
+        result.update(compiled)
+    return result
+
+
+def invalidate(user_id):
+    _cache().delete(_key(user_id), version=_VERSION)
+
+
+def next_occurrences(schedule, now):
+    """
+    每個有設定時間的 (時段, 藥) 下一次的時間：今天還沒過就是今天，否則明天。
+    now 要是帶時區的 datetime；回傳依時間排序的 [(at, item), ...]
+    """
+    result = []
+    for item in schedule["items"]:
+        at = datetime.combine(now.date(), dtime.fromisoformat(item[1]), tzinfo=now.tzinfo)
+        if at <= now:
+            at += timedelta(days=1)
+        result.append((at, item))
+    result.sort(key=lambda r: r[0])
+    return result
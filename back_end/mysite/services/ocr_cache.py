@@ -0,0 +1,33 @@
+# mysite/services/ocr_cache.py
+"""
+影像辨識結果快取（以影像位元組的 SHA-256 為鍵）。
+
+長者逾時後常重傳同一張照片；命中時直接拿上次的結果，
+跳過 YOLO / Google Vision / GPT。存放在 settings.CACHES["ocr"]（TTL 與筆數上限在那裡設定）。
+"""
+import hashlib
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+BLOOD = "blood"            # 血壓：{systolic, diastolic, pulse}
+PRESCRIPTION = "rx"        # 藥單：{ocr_text, gpt_result, prescriptions: {UserID: PrescriptionID}}
+
+_VERSION = 1               # 結果格式改變時 +1，舊快取自動失效
+
+
+def _cache():
+    return caches["ocr"]
+
+
+def image_key(kind: str, raw) -> str:
+    return f"ocr:{kind}:{hashlib.sha256(raw).hexdigest()}"
+
+
+def get_result(key: str):
+    return _cache().get(key, version=_VERSION)
+
+
+def set_result(key: str, value, timeout=DEFAULT_TIMEOUT):
+    # 沒給 timeout 就用 CACHES["ocr"]["TIMEOUT"]
+    _cache().set(key, value, timeout, version=_VERSION)
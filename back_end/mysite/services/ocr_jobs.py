@@ -0,0 +1,64 @@
+# mysite/services/ocr_jobs.py
+"""
+藥單 OCR 背景工作。
+
+POST 只建立 OcrJob 就回應；真正的 Vision → GPT → 入庫在固定大小的 thread pool 裡跑，
+settings.OCR_JOB_WORKERS 同時也是對 Google Vision / OpenAI 的並行上限。
+狀態與結果寫回 OcrJob，任何 worker 收到 GET 都查得到。
+
+注意：影像只放在記憶體裡交給 thread；process 重啟時還沒跑完的工作會停在 pending/running。
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from mysite.models import OcrJob
+from mysite.services.prescription_ocr import PrescriptionOcrError, analyze_prescription
+
+_EXECUTOR = None
+_lock = threading.Lock()
+
+
+def _executor():
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        with _lock:
+            if _EXECUTOR is None:
+                _EXECUTOR = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "OCR_JOB_WORKERS", 4),
+                    thread_name_prefix="ocr-job",
+                )
+    return _EXECUTOR
+
+
+def submit(user, target_user, image_bytes):
+    job = OcrJob.objects.create(UserID=user, TargetUserID=target_user)
+    # 等 OcrJob 真的 commit 之後才排進 pool，worker 才查得到這筆
+    transaction.on_commit(lambda: _executor().submit(_run, job.pk, image_bytes))
+    return job
+
+
+def _update(job_id, **fields):
+    # QuerySet.update 不會觸發 auto_now，自己補上 updated_at
+    OcrJob.objects.filter(pk=job_id).update(updated_at=timezone.now(), **fields)
+
+
+def _run(job_id, image_bytes):
+    close_old_connections()
+    try:
+        _update(job_id, status="running")
+        job = OcrJob.objects.select_related("TargetUserID").get(pk=job_id)
+        try:
+            payload = analyze_prescription(image_bytes, job.TargetUserID)
+        except PrescriptionOcrError as e:
+            _update(job_id, status="failed", result=e.payload, error=str(e)[:255])
+        except Exception as e:
+            print("❌ OCR 工作失敗：", job_id, e)
+            _update(job_id, status="failed", error=f"{type(e).__name__}: {e}"[:255])
+        else:
+            _update(job_id, status="done", result=payload)
+    finally:
+        close_old_connections()
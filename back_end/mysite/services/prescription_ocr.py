@@ -0,0 +1,225 @@
+# mysite/services/prescription_ocr.py
+"""
+藥單 OCR 流程：Google Vision 取文字 → GPT 結構化 → 寫入 Med。
+同步的 OcrAnalyzeView 與背景的 OCR 工作（services/ocr_jobs.py）共用。
+"""
+import json
+import uuid
+
+from django.db import connection, transaction
+
+from mysite.models import Med
+from mysite.services import clients, ocr_cache, reminder_occurrences
+from mysite.services.lazy_imports import LazyModule
+from mysite.services.med_freq import parse_freq
+
+
+# Vision / OpenAI client 由 services/clients 共用；這裡只需要 vision.Image 型別
+vision = LazyModule("google.cloud.vision")
+
+
+class PrescriptionOcrError(Exception):
+    """可預期的失敗（看不到文字、GPT 不是 JSON…）；payload/status 直接回給前端"""
+
+    def __init__(self, payload, status=400):
+        super().__init__(payload.get("error"))
+        self.payload = payload
+        self.status = status
+
+
+def analyze_with_gpt(ocr_text: str) -> str:
+    prompt = f"""
+        你是一個嚴謹的藥單 OCR 與結構化助手。請從藥袋/收據的 OCR 文字中抽取結構化資訊，並【只輸出純 JSON】。
+        請注意：對於藥物的服藥次數，若有 `xNxD` 格式，請根據 `N`（每天的服藥次數）與 `D`（服藥天數）計算 `TotalDosage`（總服藥次數）。例如：`x4x3` 代表一天四次、服用三天，則 `TotalDosage` 是 4 * 3 = 12 次。
+
+        ### OCR 內容
+        {ocr_text}
+
+        ### 輸出 JSON Schema
+        {{
+        "diseaseNames": string[],   
+        "medications": [
+            {{
+            "medicationName": string,                         
+            "administrationRoute": "內服"|"外用"|"其他",       
+            "dosageFrequency": "一天一次"|"一天兩次"|"一天三次"|"一天四次"|"睡前"|"必要時"|"未知",
+            "effect": string,                                  
+            "sideEffect": string,
+            "TotalDosage": integer,  # 計算總服藥次數
+            }}
+        ]
+        }}
+
+        ### 規則
+        1) xNxD → 一天 N 次，D 為天數。根據這個格式計算 `TotalDosage`（總服藥次數）。
+        - 內服 1.00 x4x3 → 一天四次，吃三天，`TotalDosage` = 4 * 3 = 12 次
+        - 內服 1.00 xlx3 → 一天一次，吃三天，`TotalDosage` = 1 * 3 = 3 次
+        - 如果是必要時服用，則 `TotalDosage` = 0。
+        2) 若文字含「一天/每日 N 次」「N次/日」，請正規化為對應字串。
+        3) 出現「睡前/睡覺前」→ 睡前；「必要時/PRN」→ 必要時。
+        4) 路徑：出現「內服/口服」→ 內服；「外用」→ 外用；其餘 → 其他。
+        5) 僅輸出 JSON，不得包含說明文字或程式碼圍欄。
+        """
+
+    response = clients.openai_client().chat.completions.create(
+        model="gpt-4o-mini",
+        response_format={"type": "json_object"},  
+        messages=[
+            {"role": "system", "content": "你是超級專業且嚴謹的藥劑師，會把藥單 OCR 結構化輸出。"},
+            {"role": "user", "content": prompt},
+        ],
+        temperature=0.1,
+    )
+
+    return (response.choices[0].message.content or "").strip()
+
+
+def recognize_prescription(image_bytes):
+    """
+    影像 → (cache_key, entry, parsed)。同一張圖（SHA-256 相同）直接用快取，不打 Vision / GPT。
+    entry 是快取內容 {ocr_text, gpt_result, prescriptions}；prescriptions 記錄這張圖已經
+    替哪位長者建過哪張藥單（{UserID: PrescriptionID}），由 analyze_prescription 寫回。
+    """
+    cache_key = ocr_cache.image_key(ocr_cache.PRESCRIPTION, image_bytes)
+    cached = ocr_cache.get_result(cache_key)
+
+    if cached is not None:
+        # 同一張藥單重傳：沿用上次的 OCR / GPT 結果
+        ocr_text, gpt_result = cached["ocr_text"], cached["gpt_result"]
+    else:
+        # 1) Google Vision OCR
+        image = vision.Image(content=image_bytes)
+        response = clients.vision_client().text_detection(image=image, **clients.vision_call_options())
+        annotations = response.text_annotations
+
+        if not annotations:
+            raise PrescriptionOcrError({"error": "無法辨識文字"}, status=400)
+
+        ocr_text = (annotations[0].description or "").strip()
+        print("🔍 OCR 結果：", ocr_text)
+
+        # 2) 丟 GPT 解析
+        gpt_result = analyze_with_gpt(ocr_text)
+        print("🔍 GPT 原始結果：", gpt_result)
+
+    try:
+        parsed = json.loads(gpt_result)
+    except json.JSONDecodeError:
+        raise PrescriptionOcrError({"error": "GPT 回傳非有效 JSON", "raw": gpt_result}, status=400)
+
+    entry = cached
+    if entry is None:
+        entry = {"ocr_text": ocr_text, "gpt_result": gpt_result, "prescriptions": {}}
+        ocr_cache.set_result(cache_key, entry)
+    return cache_key, entry, parsed
+
+
+def validate_medications(parsed):
+    """
+    先把整張藥單檢查、正規化完（頻率用 parse_freq），有任何一筆不合格就整張退回，
+    不會寫一半。回傳 (disease, [欄位 dict, ...])。
+    """
+    if not isinstance(parsed, dict):
+        raise PrescriptionOcrError({"error": "藥單格式錯誤"}, status=400)
+
+    disease_names = parsed.get("diseaseNames") or []
+    if not isinstance(disease_names, list):
+        disease_names = [disease_names]
+    disease = (str(disease_names[0]) if disease_names else "未知")[:50] or "未知"
+
+    meds = parsed.get("medications") or []
+    if not isinstance(meds, list):
+        raise PrescriptionOcrError({"error": "medications 必須是陣列"}, status=400)
+
+    rows, errors = [], []
+    for i, m in enumerate(meds):
+        if not isinstance(m, dict):
+            errors.append({"index": i, "error": "藥物資料必須是物件"})
+            continue
+
+        try:
+            total = int(m.get("TotalDosage") or 0)
+        except (TypeError, ValueError):
+            errors.append({"index": i, "error": f"TotalDosage 不是整數：{m.get('TotalDosage')!r}"})
+            continue
+        if total < 0:
+            errors.append({"index": i, "error": "TotalDosage 不可為負數"})
+            continue
+
+        freq = parse_freq((m.get("dosageFrequency") or "").strip())
+        if not total and freq.total_dosage:
+            # GPT 沒算 TotalDosage 時，用 xNxD / N天 推算
+            total = freq.total_dosage
+
+        rows.append({
+            "MedName": (str(m.get("medicationName") or "") or "未知")[:50],
+            "AdministrationRoute": (str(m.get("administrationRoute") or "") or "未知")[:10],
+            "DosageFrequency": freq.label,
+            "Effect": (str(m.get("effect") or "") or "未知")[:100],
+            "SideEffect": (str(m.get("sideEffect") or "") or "未知")[:100],
+            "TotalDosage": total,
+        })
+
+    if errors:
+        raise PrescriptionOcrError({"error": "藥單資料驗證失敗", "detail": errors}, status=400)
+    return disease, rows
+
+
+def ingest_prescription(target_user, parsed):
+    """
+    驗證後在同一個 transaction 裡一次 bulk_create 整張藥單。
+    回傳 (prescription_id, 寫入的 Med list)。
+    """
+    disease, rows = validate_medications(parsed)
+    prescription_id = uuid.uuid4()
+    objs = [
+        Med(UserID=target_user, Disease=disease, PrescriptionID=prescription_id, **row)
+        for row in rows
+    ]
+    if not objs:
+        return prescription_id, []
+
+    with transaction.atomic():
+        created = Med.objects.bulk_create(objs)
+        if not connection.features.can_return_rows_from_bulk_insert:
+            # MySQL 的 bulk insert 拿不回自動編號，再撈一次這張藥單
+            created = list(Med.objects.filter(PrescriptionID=prescription_id).order_by("MedId"))
+        # bulk_create 不會發 post_save，自己清掉用藥時段表、重建提醒
+        reminder_occurrences.schedule_changed_on_commit(target_user.pk)
+
+    print(f"[WRITE] {len(created)} meds -> prescription {prescription_id}")
+    return prescription_id, created
+
+
+def analyze_prescription(image_bytes, target_user):
+    """
+    完整流程，回傳給前端的 payload（同步 API 與背景工作的結果格式一致）。
+    逾時後重傳同一張照片：這張圖已經替同一位長者建過藥單（而且還在），
+    直接回傳那張藥單，不再寫一次（不會多出重複的 Med 與提醒）。
+    """
+    cache_key, entry, parsed = recognize_prescription(image_bytes)
+
+    done = (entry.get("prescriptions") or {}).get(target_user.pk)
+    if done:
+        meds = list(Med.objects.filter(PrescriptionID=done, UserID=target_user).order_by("MedId"))
+        if meds:
+            return {
+                "message": f"這張藥單已經寫入過（{len(meds)} 筆），沒有重複建立",
+                "created_count": 0,
+                "prescription_id": str(done),
+                "med_ids": [m.MedId for m in meds],
+                "parsed": parsed,
+            }
+        # 藥單已經被刪掉：當成新的重新寫入
+
+    prescription_id, meds = ingest_prescription(target_user, parsed)
+    if meds:
+        entry["prescriptions"] = {**(entry.get("prescriptions") or {}), target_user.pk: str(prescription_id)}
+        ocr_cache.set_result(cache_key, entry)
+    return {
+        "message": f"✅ 成功寫入 {len(meds)} 筆藥單資料",
+        "created_count": len(meds),
+        "prescription_id": str(prescription_id),
+        "med_ids": [m.MedId for m in meds],
+        "parsed": parsed,  # 方便前端比對
+    }
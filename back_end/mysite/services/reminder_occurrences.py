@@ -0,0 +1,114 @@
+# mysite/services/reminder_occurrences.py
+"""
+把用藥時段表（services/med_schedule.py）展開成未來 N 天的提醒時間，存進 ReminderOccurrence。
+
+- 定期由 `python manage.py roll_reminders` 重建整個視窗（cron / systemd timer，例如每小時一次）
+- 單一長者的 Med / MedTimeSetting 變動時（mysite/signals.py）只重建那個人；
+  同一個 transaction 裡改了好幾列（例如刪掉整張藥單）也只在 commit 後重建一次
+- 裝置查詢只剩一次 (UserID, RemindAt) 範圍查詢，不必在輪詢時重算
+
+時間以 Asia/Taipei 的牆上時間展開（zoneinfo），DB 存 UTC。
+"""
+import threading
+from datetime import datetime, time as dtime, timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from mysite.models import MedTimeSetting, ReminderOccurrence
+from mysite.services import med_schedule
+
+TAIPEI = ZoneInfo("Asia/Taipei")
+_CHUNK = 500          # 每批處理幾位長者
+
+_pending = threading.local()   # 這個 thread 等 commit 後要重建的長者
+
+
+def window_days():
+    return getattr(settings, "REMINDER_WINDOW_DAYS", 7)
+
+
+def expand(user_id, schedule, start, end):
+    """時段表 → [start, end) 之間每一次提醒的 ReminderOccurrence（未存檔）"""
+    items = [(dtime.fromisoformat(it[1]), it) for it in schedule["items"]]
+    if not items:
+        return []
+
+    out = []
+    day = start.astimezone(TAIPEI).date()
+    last_day = end.astimezone(TAIPEI).date()
+    while day <= last_day:
+        for t, (slot, _t, med_name, freq, prescription_id, disease) in items:
+            at = datetime.combine(day, t, tzinfo=TAIPEI)
+            if start <= at < end:
+                out.append(ReminderOccurrence(
+                    UserID_id=user_id, RemindAt=at, Slot=slot, MedName=med_name,
+                    DosageFrequency=freq, PrescriptionID=prescription_id, Disease=disease,
+                ))
+        day += timedelta(days=1)
+    return out
+
+
+def roll(user_ids=None, days=None, now=None):
+    """
+    重建指定長者（預設：所有有設定用藥時間的人）從現在起 days 天的提醒，回傳寫入筆數。
+    已經過去的提醒一併清掉。
+    """
+    now = now or timezone.now()
+    end = now + timedelta(days=days or window_days())
+    if user_ids is None:
+        user_ids = MedTimeSetting.objects.values_list("UserID_id", flat=True).distinct()
+    user_ids = sorted(set(user_ids))
+
+    written = 0
+    for i in range(0, len(user_ids), _CHUNK):
+        chunk = user_ids[i:i + _CHUNK]
+        schedules = med_schedule.get_schedules(chunk)
+        objs = []
+        for uid in chunk:
+            objs.extend(expand(uid, schedules[uid], now, end))
+
+        with transaction.atomic():
+            ReminderOccurrence.objects.filter(UserID_id__in=chunk).delete()
+            ReminderOccurrence.objects.bulk_create(objs, batch_size=1000)
+        written += len(objs)
+    return written
+
+
+def schedule_changed(user_ids):
+    """Med / MedTimeSetting 有變動（在 commit 之後呼叫）：清掉時段表快取，重建這些人的提醒"""
+    if isinstance(user_ids, int):
+        user_ids = [user_ids]
+    for uid in user_ids:
+        med_schedule.invalidate(uid)
+    roll(user_ids)
+
+
+def schedule_changed_on_commit(user_id):
+    """
+    登記「commit 後重建這位長者」。同一個 transaction 裡登記幾次、幾位長者，
+    commit 後都只跑一次 schedule_changed（第一個 on_commit 把累積的人一起處理，其餘的沒事做）。
+    transaction rollback 時留下的人會在這個 thread 下一次 commit 時一起重建（重建本身冪等）。
+    """
+    users = getattr(_pending, "users", None)
+    if users is None:
+        users = _pending.users = set()
+    users.add(user_id)
+    transaction.on_commit(_flush_pending)
+
+
+def _flush_pending():
+    users = getattr(_pending, "users", None)
+    if not users:
+        return
+    _pending.users = set()
+    schedule_changed(sorted(users))
+
+
+def purge_orphans():
+    """已經沒有 MedTimeSetting 的人，把留下來的提醒清掉"""
+    return ReminderOccurrence.objects.exclude(
+        UserID_id__in=MedTimeSetting.objects.values("UserID_id")
+    ).delete()[0]
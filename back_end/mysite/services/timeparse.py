@@ -0,0 +1,111 @@
+# mysite/services/timeparse.py
+"""
+手機 / 前端送來的時間共用一個解析器（通話紀錄匯入、血壓上傳與離線同步都用這個）。
+
+接受：
+  - epoch 秒或毫秒（int / float / 數字字串；> 10^10 視為毫秒）
+  - ISO 8601（'T' 或空白分隔、可有小數秒、'Z' 或 +08:00）
+  - 2025/9/20 14:35、2025-9-20 這類斜線 / 不補零的寫法
+  - datetime 物件（沒有時區視為 UTC，與 DB 存的一致）
+沒有時區的字串視為 default_tz（預設 Asia/Taipei）。
+
+依字串長相直接挑解析方式，不再 fromisoformat 失敗後逐一 try strptime；
+時區物件只建一次。解析失敗回 None，由呼叫端決定要報錯還是用現在時間。
+benchmark：python manage.py bench_timeparse
+"""
+import re
+from datetime import datetime, timedelta, timezone as py_tz
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+UTC = py_tz.utc
+TAIPEI = ZoneInfo("Asia/Taipei")
+
+# 台灣 1980 年後沒有日光節約時間，固定 +08:00：換算 UTC 不必查 zoneinfo 的轉換表
+_FIXED_OFFSETS = {TAIPEI: (1980, py_tz(timedelta(hours=8)))}
+
+_EPOCH_MS_THRESHOLD = 10_000_000_000
+
+# 2025/9/20、2025-9-20 14:35、2025/09/20 14:35:32.5
+_LOOSE_RE = re.compile(
+    r"(\d{4})[-/](\d{1,2})[-/](\d{1,2})"
+    r"(?:[ T](\d{1,2}):(\d{1,2})(?::(\d{1,2})(?:\.(\d{1,6}))?)?)?$"
+)
+
+
+@lru_cache(maxsize=64)
+def get_tz(name):
+    """時區名稱 → ZoneInfo（快取）；不認得的名稱回 None"""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def _from_epoch(n):
+    if n > _EPOCH_MS_THRESHOLD:
+        n = n / 1000.0
+    try:
+        return datetime.fromtimestamp(n, tz=UTC)
+    except (OverflowError, OSError, ValueError):
+        return None
+
+
+def _from_string(s, default_tz):
+    if s.isdigit():
+        return _from_epoch(int(s))
+
+    # ISO 長相（YYYY-MM-DD 開頭）交給 C 實作的 fromisoformat；Python 3.11 起也吃 'Z'
+    if len(s) >= 10 and s[4] == "-" and s[7] == "-":
+        try:
+            dt = datetime.fromisoformat(s)
+        except ValueError:
+            dt = None
+        if dt is not None:
+            return _localize(dt, default_tz) if dt.tzinfo is None else dt
+
+    m = _LOOSE_RE.match(s)
+    if m is None:
+        return None
+    y, mo, d, h, mi, sec, frac = m.groups()
+    try:
+        dt = datetime(
+            int(y), int(mo), int(d), int(h or 0), int(mi or 0), int(sec or 0),
+            int(frac.ljust(6, "0")) if frac else 0,
+        )
+    except ValueError:
+        return None
+    return _localize(dt, default_tz)
+
+
+def _localize(naive, tz):
+    fixed = _FIXED_OFFSETS.get(tz)
+    if fixed is not None and naive.year >= fixed[0]:
+        return naive.replace(tzinfo=fixed[1])
+    return naive.replace(tzinfo=tz)
+
+
+def parse_timestamp(value, default_tz=TAIPEI, minute=False):
+    """
+    任意輸入 → UTC aware datetime；無法解析（含 None / 空字串）回 None。
+    minute=True 時清掉秒 / 微秒（通話紀錄與血壓以分鐘為單位去重）。
+    """
+    if isinstance(value, datetime):
+        dt = value if value.tzinfo else value.replace(tzinfo=UTC)
+    elif isinstance(value, bool):
+        return None
+    elif isinstance(value, (int, float)):
+        dt = _from_epoch(value)
+    elif isinstance(value, str):
+        s = value.strip()
+        dt = _from_string(s, default_tz) if s else None
+    else:
+        return None
+
+    if dt is None:
+        return None
+    if dt.tzinfo is not UTC:
+        dt = dt.astimezone(UTC)
+    if minute:
+        dt = dt.replace(second=0, microsecond=0)
+    return dt
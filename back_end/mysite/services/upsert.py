@@ -0,0 +1,105 @@
+# mysite/services/upsert.py
+"""
+upsert：寫入本身是一個 statement，bulk_create(update_conflicts=True)
+（MySQL 為 INSERT ... ON DUPLICATE KEY UPDATE，SQLite / PostgreSQL 為 ON CONFLICT (...) DO UPDATE）。
+
+取代 get_or_create + save()：同時送出也不會撞 IntegrityError，也不會互相蓋掉一半。
+好處是正確性與批次（N 筆仍是固定幾次查詢），不是單筆延遲：
+  - 寫入前一次 SELECT 看哪些唯一鍵已存在，才能回報新增 / 更新 / 值相同；
+    這個分類只是參考（剛好同時有人寫入時可能不準），寫入本身一定正確
+  - MySQL 拿不回自動編號，有新增時再一次 SELECT 補 pk
+單筆來說 MySQL 上是 SELECT + INSERT (+ SELECT)，和原本 get_or_create + save() 的次數差不多。
+
+MySQL 的 ON DUPLICATE KEY UPDATE 不能指定衝突的欄位（supports_update_conflicts_with_target 為 False），
+由表上的唯一鍵決定；所以 unique_fields 對應的唯一限制必須是該表「唯一」會撞到的那一個（pk 為自動編號）。
+
+newer_field（例如血壓的 CapturedAt）：寫入前那次 SELECT 順便讀出來，DB 裡已經比較新的就不覆蓋
+（離線補傳的舊量測不會蓋掉已經上傳的新量測）。跟分類一樣是以那次讀到的為準。
+"""
+from typing import NamedTuple
+
+from django.db import connection, transaction
+
+
+class UpsertResult(NamedTuple):
+    created: list       # 新增的物件
+    updated: list       # 已存在、值有變
+    unchanged: list     # 已存在、compare_fields 的值都一樣（仍會寫入，例如 updated_at）
+    skipped: list = []  # 已存在且 newer_field 比較新，沒有寫入
+
+
+def _attnames(model, names):
+    return [model._meta.get_field(name).attname for name in names]
+
+
+def upsert(model, objs, unique_fields, update_fields, compare_fields=None, batch_size=None, newer_field=None):
+    """
+    objs：尚未存檔的 model 物件；unique_fields 必須對應到一個唯一限制。
+    寫入後每個物件都會帶上 pk（已存在的沿用原本的 pk）。
+    compare_fields：判斷「值相同」用的欄位，預設 update_fields。
+    newer_field：已存在的列這個欄位比 obj 新時不覆蓋（放進 skipped）；一樣新照常覆蓋。
+    """
+    objs = list(objs)
+    if not objs:
+        return UpsertResult([], [], [], [])
+
+    key_attrs = _attnames(model, unique_fields)
+    compare_attrs = _attnames(model, compare_fields or update_fields)
+    newer_attrs = _attnames(model, [newer_field]) if newer_field else []
+    pk_attr = model._meta.pk.attname
+
+    def key(obj):
+        return tuple(getattr(obj, a) for a in key_attrs)
+
+    # 1) 已存在的列：每個唯一欄位各取 IN，再在 Python 端比對完整的鍵
+    lookup = {f"{a}__in": {getattr(o, a) for o in objs} for a in key_attrs}
+    existing = {
+        tuple(row[:len(key_attrs)]): row[len(key_attrs):]
+        for row in model.objects.filter(**lookup).values_list(*key_attrs, pk_attr, *compare_attrs, *newer_attrs)
+    }
+
+    # DB 裡比較新的不覆蓋
+    skipped = []
+    if newer_attrs:
+        keep = []
+        for obj in objs:
+            row = existing.get(key(obj))
+            if row is not None and row[-1] is not None and getattr(obj, newer_attrs[0]) < row[-1]:
+                setattr(obj, pk_attr, row[0])
+                skipped.append(obj)
+            else:
+                keep.append(obj)
+        objs = keep
+
+    # 2) 一個 statement 寫入；MySQL 不支援指定衝突欄位，傳了會丟 NotSupportedError
+    conflict_target = {"unique_fields": unique_fields} if connection.features.supports_update_conflicts_with_target else {}
+    if objs:
+        with transaction.atomic():
+            model.objects.bulk_create(
+                objs,
+                update_conflicts=True,
+                update_fields=update_fields,
+                batch_size=batch_size,
+                **conflict_target,
+            )
+
+    created, updated, unchanged = [], [], []
+    for obj in objs:
+        row = existing.get(key(obj))
+        if row is None:
+            created.append(obj)
+            continue
+        setattr(obj, pk_attr, row[0])
+        if tuple(row[1:1 + len(compare_attrs)]) == tuple(getattr(obj, a) for a in compare_attrs):
+            unchanged.append(obj)
+        else:
+            updated.append(obj)
+
+    # MySQL 的 bulk insert 拿不回自動編號：新增的再撈一次 pk
+    if created and not connection.features.can_return_rows_from_bulk_insert:
+        lookup = {f"{a}__in": {getattr(o, a) for o in created} for a in key_attrs}
+        pks = {tuple(row[:-1]): row[-1] for row in model.objects.filter(**lookup).values_list(*key_attrs, pk_attr)}
+        for obj in created:
+            setattr(obj, pk_attr, pks.get(key(obj)))
+
+    return UpsertResult(created, updated, unchanged, skipped)
@@ -0,0 +1,16 @@
+# mysite/signals.py
+# Med / MedTimeSetting 變動時清掉該長者的用藥時段表快取、重建預先展開的提醒
+# （見 mysite/services/med_schedule.py、reminder_occurrences.py）
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from mysite.models import Med, MedTimeSetting
+from mysite.services import reminder_occurrences
+
+
+@receiver([post_save, post_delete], sender=Med)
+@receiver([post_save, post_delete], sender=MedTimeSetting)
+def med_schedule_changed(sender, instance, **kwargs):
+    # 等 commit 之後再清，避免其他 request 在 commit 前又把舊資料編回快取；
+    # 一次刪掉整張藥單會每列發一次 signal，同一個 transaction 只重建一次
+    reminder_occurrences.schedule_changed_on_commit(instance.UserID_id)
@@ -2,4 +2,377 @@ from django.test import TestCase
 
 # Create your tests here.
 from django.utils import timezone
-print("📅 Django now() =", timezone.now())
\ No newline at end of file
+print("📅 Django now() =", timezone.now())
+
+import json
+import re
+import uuid
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from mysite.models import Med, MedTimeSetting, User
+from mysite.services import med_schedule
+
+
+def _chosen_indexes(sql):
+    """EXPLAIN 一句 SQL，回傳 optimizer 實際選用的索引（MySQL 看 key，不是 possible_keys）"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute('EXPLAIN FORMAT=JSON ' + sql)
+            plan = cursor.fetchone()[0]
+            found, stack = set(), [json.loads(plan)]
+            while stack:
+                node = stack.pop()
+                if isinstance(node, dict):
+                    if isinstance(node.get('key'), str):
+                        found.add(node['key'])
+                    stack.extend(node.values())
+                elif isinstance(node, list):
+                    stack.extend(node)
+            return found, plan
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = '\n'.join(row[-1] for row in cursor.fetchall())
+            return set(re.findall(r'USING (?:COVERING )?INDEX (\w+)', plan)), plan
+        cursor.execute('EXPLAIN ' + sql)
+        plan = '\n'.join(row[0] for row in cursor.fetchall())
+        return set(re.findall(r'Index (?:Only )?Scan (?:Backward )?using (\w+)', plan)), plan
+
+
+class MedQueryPlanTests(TestCase):
+    """
+    呼叫實際的 endpoint / service，把它對該表下的查詢拿去 EXPLAIN，
+    確認 optimizer 真的選了對應的索引
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(Name='plan', Phone='0900000001', RelatedID=None)
+        cls.rx = uuid.uuid4()
+        Med.objects.bulk_create([
+            Med(UserID=cls.user, Disease='d', MedName=f'm{i}', AdministrationRoute='oral',
+                DosageFrequency='一天一次', Effect='e', SideEffect='s', PrescriptionID=cls.rx)
+            for i in range(5)
+        ])
+        MedTimeSetting.objects.create(UserID=cls.user)
+        # 其他長者的資料：表不要小到全表掃描比較划算
+        others = User.objects.bulk_create([User(Name=f'o{i}', Phone=f'091{i:07d}') for i in range(40)])
+        Med.objects.bulk_create([
+            Med(UserID=u, Disease='d', MedName=f'm{i}', AdministrationRoute='oral',
+                DosageFrequency='一天一次', Effect='e', SideEffect='s', PrescriptionID=uuid.uuid4())
+            for u in others for i in range(5)
+        ])
+        MedTimeSetting.objects.bulk_create([MedTimeSetting(UserID=u) for u in others])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertQueriesUseIndex(self, call, table, column, *index_names):
+        """call() 期間對 table、WHERE 有 column 的每一句 SELECT 都要用到 index_names 其中之一"""
+        qn = connection.ops.quote_name
+        with CaptureQueriesContext(connection) as ctx:
+            call()
+        sqls = [q['sql'] for q in ctx.captured_queries
+                if q['sql'].startswith('SELECT') and f'FROM {qn(table)}' in q['sql']
+                and qn(column) in q['sql'].partition(' WHERE ')[2]]
+        self.assertTrue(sqls, f'沒有對 {table}.{column} 的查詢')
+        for sql in sqls:
+            chosen, plan = _chosen_indexes(sql)
+            self.assertTrue(chosen & set(index_names), f'沒有用到 {index_names}：\n{sql}\n{plan}')
+
+    def test_delete_prescription_uses_rx_user_index(self):
+        self.assertQueriesUseIndex(
+            lambda: self.client.delete(f'/api/delete-prescription/{self.rx}/'),
+            'mysite_med', 'PrescriptionID', 'idx_med_rx_user',
+        )
+
+    def test_get_med_by_prescription_uses_rx_user_index(self):
+        self.assertQueriesUseIndex(
+            lambda: self.client.get(f'/api/meds/{self.rx}/'),
+            'mysite_med', 'PrescriptionID', 'idx_med_rx_user',
+        )
+
+    def test_start_medication_uses_user_name_index(self):
+        self.assertQueriesUseIndex(
+            lambda: self.client.post('/start_medication/', {'userId': self.user.pk, 'medName': ['m1', 'm2']},
+                                     format='json'),
+            'mysite_med', 'MedName', 'idx_med_user_name',
+        )
+
+    def test_med_time_setting_lookup_uses_unique_index(self):
+        med_schedule.invalidate(self.user.pk)
+        # SQLite 重建資料表時會把 UniqueConstraint 變成內建的 sqlite_autoindex
+        self.assertQueriesUseIndex(
+            lambda: self.client.get('/api/get-med-reminders-by-userid/', {'user_id': self.user.pk}),
+            'mysite_medtimesetting', 'UserID',
+            'uniq_medtimesetting_user', 'sqlite_autoindex_mysite_medtimesetting_1',
+        )
+
+
+import datetime
+from unittest import mock
+
+from django.db import NotSupportedError, connection
+
+from mysite.models import FitData
+from mysite.services.upsert import upsert
+
+
+def _targetless_on_conflict(fields, on_conflict, update_fields, unique_fields):
+    # 模擬 MySQL 的 ON DUPLICATE KEY UPDATE：不指定衝突欄位，由表上的唯一鍵決定
+    # （SQLite 3.35+ 最後一個 ON CONFLICT 可以省略 target）
+    sets = ", ".join(f"{connection.ops.quote_name(f)} = excluded.{connection.ops.quote_name(f)}" for f in update_fields)
+    return f"ON CONFLICT DO UPDATE SET {sets}"
+
+
+class UpsertTests(TestCase):
+    """services/upsert：本機 SQLite 與 MySQL（不能指定衝突欄位、拿不回自動編號）兩條路"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(Name='up', Phone='0900000002')
+
+    def _write(self, steps):
+        return upsert(
+            FitData,
+            [FitData(UserID=self.user, date=datetime.date(2026, 9, d), steps=steps) for d in (1, 2)],
+            unique_fields=['UserID', 'date'],
+            update_fields=['steps', 'updated_at'],
+            compare_fields=['steps'],
+        )
+
+    def _check_create_then_update(self):
+        first = self._write(100)
+        self.assertEqual(len(first.created), 2)
+        self.assertTrue(all(obj.pk for obj in first.created))
+        second = self._write(200)
+        self.assertEqual(len(second.updated), 2)
+        self.assertEqual({o.pk for o in second.updated}, {o.pk for o in first.created})
+        self.assertEqual(len(self._write(200).unchanged), 2)
+        self.assertEqual(list(FitData.objects.filter(UserID=self.user).values_list('steps', flat=True)), [200, 200])
+
+    def test_upsert(self):
+        self._check_create_then_update()
+
+    def test_upsert_mysql_path(self):
+        features = type(connection.features)
+        off = dict(new_callable=mock.PropertyMock, return_value=False)
+        with mock.patch.object(features, 'supports_update_conflicts_with_target', **off), \
+                mock.patch.object(features, 'can_return_rows_from_bulk_insert', **off), \
+                mock.patch.object(connection.ops, 'on_conflict_suffix_sql', _targetless_on_conflict):
+            # Django 在這種後端指定 unique_fields 會直接拒絕
+            with self.assertRaises(NotSupportedError):
+                FitData.objects.bulk_create(
+                    [FitData(UserID=self.user, date=datetime.date(2026, 9, 1), steps=1)],
+                    update_conflicts=True, unique_fields=['UserID', 'date'], update_fields=['steps'],
+                )
+            self._check_create_then_update()
+
+
+from mysite.services import reminder_occurrences
+
+
+class ScheduleChangedTests(TestCase):
+    """Med 每列的 post_save / post_delete 在同一個 transaction 只重建一次提醒"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(Name='roll', Phone='0900000003')
+        cls.rx = uuid.uuid4()
+        Med.objects.bulk_create([
+            Med(UserID=cls.user, Disease='d', MedName=f'm{i}', AdministrationRoute='oral',
+                DosageFrequency='一天一次', Effect='e', SideEffect='s', PrescriptionID=cls.rx)
+            for i in range(10)
+        ])
+
+    def setUp(self):
+        # 其他測試 rollback 掉的 transaction 留下的待重建長者（正式環境會在下一次 commit 一起重建）
+        reminder_occurrences._pending.users = set()
+
+    def test_delete_prescription_rolls_once(self):
+        with mock.patch.object(reminder_occurrences, 'roll') as roll, \
+                self.captureOnCommitCallbacks(execute=True):
+            deleted, _ = Med.objects.filter(PrescriptionID=self.rx, UserID=self.user).delete()
+        self.assertEqual(deleted, 10)
+        roll.assert_called_once_with([self.user.pk])
+
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.test import SimpleTestCase
+
+from mysite.services import blood_inference
+
+
+class BatcherTests(SimpleTestCase):
+    """worker 忙的時候進來的影像要併成下一批，不是一張一批排在 pool 的佇列裡"""
+
+    def test_submits_during_slow_batch_are_merged(self):
+        release = threading.Event()
+        sizes = []
+
+        def slow_infer(images):
+            sizes.append(len(images))
+            if len(sizes) == 1:
+                release.wait(5)   # 第一批佔著唯一的 worker
+            return [{'n': img} for img in images]
+
+        pool = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(pool.shutdown)
+        with mock.patch.object(blood_inference, '_infer_batch', slow_infer), \
+                mock.patch.object(blood_inference, '_get_pool', return_value=(pool, None)):
+            batcher = blood_inference._Batcher(window_ms=5, max_batch=8, max_in_flight=1)
+            first = batcher.submit(0)
+            while not sizes:
+                time.sleep(0.001)
+            # 第一批還在跑：這些分好幾個時間窗進來
+            later = []
+            for i in range(1, 6):
+                later.append(batcher.submit(i))
+                time.sleep(0.01)
+            release.set()
+            results = [f.result(timeout=5) for f in [first] + later]
+
+        self.assertEqual(sizes, [1, 5])
+        self.assertEqual(results, [{'n': i} for i in range(6)])
+
+
+from mysite.services import call_ingest
+
+
+class CallIngestCountTests(TestCase):
+    """saved 是實際新增的筆數：重傳同一批是 existing，不是 saved"""
+
+    def test_reupload_reports_existing(self):
+        user = User.objects.create(Name='calls', Phone='0900000004')
+        records = [{'phone': '0912345%03d' % i, 'timestamp': 1760000000000 + i * 60000} for i in range(5)]
+        first = call_ingest.ingest(user, records + records[:1])
+        self.assertEqual((first['saved'], first['existing'], first['duplicates']), (5, 0, 1))
+
+        with self.assertNumQueries(3):   # SAVEPOINT、INSERT、RELEASE：沒有另外查詢
+            again = call_ingest.ingest(user, records[2:] + [{'phone': '0987654321', 'timestamp': 1760000000000}])
+        self.assertEqual((again['saved'], again['existing']), (1, 3))
+
+
+from rest_framework.test import APIClient
+
+from mysite.models import HealthCare
+
+
+class HealthCareSyncTests(TestCase):
+    """同一時段留量測時間最晚的：晚到的離線舊量測不會蓋掉 DB 裡比較新的"""
+
+    def setUp(self):
+        self.user = User.objects.create(Name='bp', Phone='0900000005')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sync(self, systolic, timestamp):
+        return self.client.post('/api/healthcare/sync/', {'readings': [{
+            'systolic': systolic, 'diastolic': 80, 'pulse': 70, 'timestamp': timestamp, 'tz': 'Asia/Taipei',
+        }]}, format='json').json()
+
+    def test_older_offline_reading_does_not_overwrite_newer(self):
+        self.sync(130, '2026-10-01T09:00:00')
+        late = self.sync(150, '2026-10-01T07:00:00')     # 離線時量的，比較晚才補傳
+        self.assertEqual((late['written'], late['skipped']), (0, 1))
+        self.assertEqual(HealthCare.objects.get(UserID=self.user, Period='morning').Systolic, 130)
+
+        newer = self.sync(125, '2026-10-01T10:30:00')
+        self.assertEqual((newer['updated'], newer['skipped']), (1, 0))
+        self.assertEqual(HealthCare.objects.get(UserID=self.user, Period='morning').Systolic, 125)
+
+
+import json
+
+from django.core.cache import caches
+
+from mysite.services import ocr_cache
+from mysite.services.prescription_ocr import analyze_prescription
+
+
+class PrescriptionReuploadTests(TestCase):
+    """逾時後重傳同一張藥單照片：回傳上次建好的藥單，不再建一張"""
+
+    IMAGE = b'same-photo'
+
+    def setUp(self):
+        caches['ocr'].clear()
+        self.user = User.objects.create(Name='rx', Phone='0900000006')
+        # 快取裡已有這張圖的辨識結果，不會打 Vision / GPT
+        ocr_cache.set_result(ocr_cache.image_key(ocr_cache.PRESCRIPTION, self.IMAGE), {
+            'ocr_text': '...',
+            'gpt_result': json.dumps({'diseaseNames': ['高血壓'], 'medications': [
+                {'medicationName': 'A', 'dosageFrequency': '一天兩次', 'TotalDosage': 6},
+                {'medicationName': 'B', 'dosageFrequency': '睡前', 'TotalDosage': 3},
+            ]}),
+        })
+
+    def test_reupload_returns_existing_prescription(self):
+        first = analyze_prescription(self.IMAGE, self.user)
+        again = analyze_prescription(self.IMAGE, self.user)
+        self.assertEqual(first['created_count'], 2)
+        self.assertEqual(again['created_count'], 0)
+        self.assertEqual((again['prescription_id'], again['med_ids']), (first['prescription_id'], first['med_ids']))
+        self.assertEqual(Med.objects.filter(UserID=self.user).count(), 2)
+
+        # 另一位長者用同一張圖：各自一張
+        other = User.objects.create(Name='rx2', Phone='0900000007')
+        self.assertEqual(analyze_prescription(self.IMAGE, other)['created_count'], 2)
+
+        # 藥單刪掉之後再傳：重新建立
+        Med.objects.filter(UserID=self.user).delete()
+        self.assertEqual(analyze_prescription(self.IMAGE, self.user)['created_count'], 2)
+
+
+import io
+
+
+class CallIngestParserTests(SimpleTestCase):
+    """串流解析：read 很小時，值切在 read 的邊界上也要解析正確；格式錯誤要停在第一個錯誤"""
+
+    READ_SIZES = (1, 2, 3, 7, 64)
+
+    def parse(self, parser, body, read_size):
+        with mock.patch.object(call_ingest, '_READ_SIZE', read_size):
+            return list(parser(io.BytesIO(body.encode('utf-8'))))
+
+    def test_array_boundaries(self):
+        for body in ['[1.5,2]', '[]', ' [ 1 , 22 ,{"a":"中文[]"} ] ', '[-0.5e+10,3 ,true,null,false]',
+                     '["x\\u4e2d\\"y", {"phone": "0912", "timestamp": 1760000000000, "extra": {}}]',
+                     '﻿[{"a": [1, {"b": "c"}]}]', '[12345678901234567890, 1e-7]']:
+            for size in self.READ_SIZES:
+                with self.subTest(body=body, read_size=size):
+                    self.assertEqual(self.parse(call_ingest.iter_json_array, body, size), json.loads(body.lstrip('﻿')))
+
+    def test_ndjson_boundaries(self):
+        records = [{'phone': '0912', 'n': 1.25}, {'name': '中文'}, [1, 2], 3]
+        for body in ['\n'.join(json.dumps(r, ensure_ascii=False) for r in records),
+                     '﻿' + '\r\n\n'.join(json.dumps(r) for r in records) + '\n\n']:
+            for size in self.READ_SIZES:
+                with self.subTest(body=body, read_size=size):
+                    self.assertEqual(self.parse(call_ingest.iter_ndjson, body, size), records)
+
+    def test_truncated_bodies(self):
+        for parser, body in [
+            (call_ingest.iter_json_array, '[1,2'), (call_ingest.iter_json_array, '[1,'),
+            (call_ingest.iter_json_array, '[1.'), (call_ingest.iter_json_array, '[tru'),
+            (call_ingest.iter_json_array, '[{"a":"b'), (call_ingest.iter_json_array, '["\\u4e'),
+            (call_ingest.iter_json_array, ''), (call_ingest.iter_json_array, '{"a": 1}'),
+            (call_ingest.iter_ndjson, '{"a": 1}\n{"b": '),
+        ]:
+            for size in self.READ_SIZES:
+                with self.subTest(body=body, read_size=size), self.assertRaises(call_ingest.IngestError):
+                    self.parse(parser, body, size)
+
+    def test_stops_at_first_syntax_error(self):
+        for bad in ['[1,x', '[1.5x', '[{"a" 1}', '[1 2']:
+            stream = io.BytesIO((bad + ' ' * 100_000 + ']').encode())
+            with mock.patch.object(call_ingest, '_READ_SIZE', 16), self.assertRaises(call_ingest.IngestError):
+                list(call_ingest.iter_json_array(stream))
+            self.assertLess(stream.tell(), 100, bad)
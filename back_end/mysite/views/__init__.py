@@ -0,0 +1,23 @@
+# mysite/views/__init__.py
+# 依子系統拆分；重量級相依（YOLO / OpenCV / Vision / OpenAI）在各模組內延遲載入，
+# 這裡只負責 re-export，讓 urls.py 維持 `views.xxx` 的寫法。
+from .account import (
+    hello_world, register_user, login, CreateFamilyView,
+    get_me, get_me_1, update_related, get_family_members,
+)
+from .health import BloodYOLOView, HealthCareByDateAPI, HealthCareRangeAPI, HealthCareSyncAPI
+from .med import (
+    OcrAnalyzeView, OcrJobView, get_ocr_job, start_medication, MedNameListView, get_med_by_prescription,
+    DeletePrescriptionView, create_med_time_setting,
+    get_med_reminders, get_med_reminders_by_userid, get_family_med_reminders, get_upcoming_reminders,
+)
+from .fit import FitDataAPI, FitDataByDateAPI, FitDataBulkAPI, FitDataRangeAPI
+from .hospital import hospital_list, hospital_create, hospital_delete
+from .call import (
+    upload_call_logs, upload_call_logs_stream, call_upload_progress, get_call_records,
+    add_scam_from_callrecord, scam_check_bulk, scam_check, scam_add,
+)
+from .location import (
+    upload_location, get_latest_location, get_family_locations,
+    reverse_geocode, location_history,
+)
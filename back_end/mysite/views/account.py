@@ -0,0 +1,235 @@
+# mysite/views/account.py
+# 註冊、登入、家庭、個人資料
+from django.utils.crypto import get_random_string
+
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes, authentication_classes
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from mysite.models import Family, User
+from mysite.serializers import UserRegisterSerializer, UserPublicSerializer, UserMeSerializer
+
+
+@api_view(['GET'])
+def hello_world(request):
+    return Response({"message": "Hello, world!(你好世界)"})
+
+
+# --------------------
+# 註冊
+# --------------------
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def register_user(request):
+    creator_id = request.data.get('creator_id')  # 可選參數
+
+    serializer = UserRegisterSerializer(data=request.data)
+    if serializer.is_valid():
+        user = serializer.save()
+
+        # 若是「家人新增長者」
+        if creator_id:
+            try:
+                creator = User.objects.get(UserID=creator_id)
+
+                if creator.is_elder:
+                    return Response({'error': '只有家人可以新增長者帳號'}, status=403)
+
+                user.RelatedID = creator
+                user.FamilyID = creator.FamilyID
+                user.is_elder = True
+                user.save()
+            except User.DoesNotExist:
+                return Response({'error': '創建者不存在'}, status=400)
+
+        # ⭐ 回傳時也帶上 avatar
+        return Response({
+            "UserID": user.UserID,
+            "Name": user.Name,
+            "Phone": user.Phone,
+            "Gender": user.Gender,
+            "Borndate": user.Borndate,
+            "FamilyID": user.FamilyID.FamilyID if user.FamilyID else None,
+            "RelatedID": user.RelatedID.UserID if user.RelatedID else None,
+            "avatar": user.avatar,   # ⭐ 新增
+        }, status=status.HTTP_201_CREATED)
+
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def login(request):
+    Phone = request.data.get('Phone')
+    password = request.data.get('password')
+
+    if not Phone or not password:
+        return Response({"message": "請提供帳號與密碼"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        user = User.objects.get(Phone=Phone)
+    except User.DoesNotExist:
+        return Response({"message": "帳號不存在"}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not user.check_password(password):
+        return Response({"message": "密碼錯誤"}, status=status.HTTP_400_BAD_REQUEST)
+
+    refresh = RefreshToken.for_user(user)
+
+    return Response({
+        "message": "登入成功",
+        "token": {
+            "refresh": str(refresh),
+            "access": str(refresh.access_token),
+        },
+        "user": {
+            "UserID": user.UserID,
+            "Name": user.Name,
+            "Phone": user.Phone,
+            "FamilyID": user.FamilyID.FamilyID if user.FamilyID else None,
+            "RelatedID": user.RelatedID.UserID if user.RelatedID else None,
+            "avatar": user.avatar,   # ⭐ 新增
+        }
+    }, status=status.HTTP_200_OK)
+
+
+#------------------------------------------------------------------------
+#創建家庭
+class CreateFamilyView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        user = request.user
+        if not user.is_authenticated:
+            return Response({'error': '未登入'}, status=401)
+
+        if user.FamilyID:  # 若已有家庭，就不能再創建
+            return Response({'error': '您已經有家庭了'}, status=400)
+
+        family_name = request.data.get('FamilyName')
+        if not family_name:
+            return Response({'error': '請輸入家庭名稱'}, status=400)
+
+        # 自動產生 Fcode（4碼數字）
+        fcode = get_random_string(4, allowed_chars='0123456789')
+
+        family = Family.objects.create(
+            FamilyName=family_name,
+            Fcode=fcode
+        )
+
+        # 綁定使用者的 FamilyID
+        user.FamilyID = family
+        user.RelatedID = None
+        user.save()
+
+        return Response({
+            'message': '家庭創建成功',
+            'FamilyID': family.FamilyID,
+            'Fcode': family.Fcode,
+            'FamilyName': family.FamilyName,
+        })
+
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication])  # 只用 JWT，避免 CSRF 影響
+@permission_classes([IsAuthenticated])
+def get_me_1(request):
+    user = request.user
+    family = getattr(user, 'FamilyID', None)  # 你的模型若是外鍵 Family
+
+    # 取 family 主鍵與 Fcode（名稱可能是 id 或 FamilyID，做容錯）
+    family_pk = None
+    family_code = None
+    if family:
+        family_pk = getattr(family, 'id', None) or getattr(family, 'FamilyID', None)
+        family_code = getattr(family, 'Fcode', None)
+
+    # RelatedID：你的定義是「有值=長者；None=家人」
+    related_user = getattr(user, 'RelatedID', None)
+    related_id = getattr(related_user, 'UserID', None) if related_user else None
+    is_elder = related_id is not None  # ✅ 直接給前端明確布林
+
+    return Response({
+        "UserID": getattr(user, "UserID", None),
+        "Name": getattr(user, "Name", None),
+        "Phone": getattr(user, "Phone", None),
+        "Gender": getattr(user, "Gender", None),
+        "Borndate": getattr(user, "Borndate", None),
+
+        # 家庭資訊
+        "FamilyPrimaryKey": family_pk,
+        "FamilyFcode": family_code,
+
+        # 長者／家人判定
+        "RelatedID": related_id,  # 有值=長者
+        "isElder": is_elder,      # ✅ 額外提供更直覺的布林
+    })
+
+
+
+
+#新增長者
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def update_related(request):
+    user = request.user  # 目前登入的家人
+
+    if user.is_elder:
+        return Response({"error": "只有家人可以新增長者"}, status=403)
+
+    name = request.data.get('Name')
+    phone = request.data.get('Phone')
+    password = request.data.get('password')
+    gender = request.data.get('Gender', 'M')
+    borndate = request.data.get('Borndate')
+
+    if not all([name, phone, password, borndate]):
+        return Response({"error": "請填寫完整資料"}, status=400)
+
+    if User.objects.filter(Phone=phone).exists():
+        return Response({"error": "此手機號碼已被註冊"}, status=400)
+
+    elder = User.objects.create_user(
+        Phone=phone,
+        Name=name,
+        Gender=gender,
+        Borndate=borndate,
+        password=password,
+        FamilyID=user.FamilyID,
+        RelatedID=user,
+        is_elder=True
+    )
+
+    return Response({
+        "message": "長者帳號建立成功",
+        "elder": {
+            "UserID": elder.UserID,
+            "Name": elder.Name,
+            "Phone": elder.Phone,
+            "RelatedID": elder.RelatedID.UserID,
+            "FamilyID": elder.FamilyID
+        }
+    }, status=201)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_family_members(request):
+    family_id = request.user.FamilyID
+    if not family_id:
+        return Response({"error": "未加入任何家庭"}, status=400)
+
+    members = User.objects.filter(FamilyID=family_id)
+    serializer = UserPublicSerializer(members, many=True)
+    return Response(serializer.data)
+
+#取個人資料
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_me(request):
+    serializer = UserMeSerializer(request.user)
+    return Response(serializer.data)
@@ -0,0 +1,349 @@
+# mysite/views/call.py
+# 通話紀錄上傳/查詢、詐騙電話
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import OuterRef, Q, Subquery
+from django.http import JsonResponse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.response import Response
+
+from mysite.models import CallRecord, Scam, User
+from mysite.services import call_ingest
+from mysite.services.call_ingest import normalize_phone
+from mysite.services.timeparse import TAIPEI, parse_timestamp
+
+
+# --------- 上傳通話（長者端或家人代上傳） ---------
+
+def _upload_target(request, elder_id):
+    """回傳 (target_user, error_response)"""
+    if not elder_id:
+        return request.user, None
+    try:
+        # TODO: 驗證 request.user 是否可代該 elder 上傳
+        return User.objects.get(pk=int(elder_id)), None
+    except (User.DoesNotExist, ValueError):
+        return None, Response({"error": "elder not found"}, status=status.HTTP_404_NOT_FOUND)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def upload_call_logs(request):
+    """
+    { "elder_id"?: 1, "records": [...] }，全部寫入（不截斷），同 user+phone+time 視為同筆。
+    筆數很多（第一次同步）建議改用 upload_call_logs_stream。
+    """
+    target_user, err = _upload_target(request, request.data.get('elder_id'))
+    if err:
+        return err
+
+    records = request.data.get('records') or []
+    if not isinstance(records, list) or not records:
+        return Response({"error": "no records"}, status=status.HTTP_400_BAD_REQUEST)
+
+    stats = call_ingest.ingest(target_user, records)
+    return Response(
+        {"saved": stats["saved"], "existing": stats["existing"],
+         "duplicates": stats["duplicates"], "invalid": stats["invalid"]},
+        status=status.HTTP_201_CREATED if stats["saved"] else status.HTTP_200_OK,
+    )
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def upload_call_logs_stream(request):
+    """
+    大量通話紀錄：body 直接是 JSON 陣列 [{...}, ...]，
+    或 Content-Type: application/x-ndjson 一行一筆。邊讀邊寫，每 CALL_INGEST_CHUNK 筆 commit 一次。
+    query：elder_id（代長者上傳）、upload_id（續傳用，用戶端自訂，例如 UUID）
+    中途斷線：用同一個 upload_id、同樣順序的資料重送，已 commit 的筆數會跳過；
+    進度可用 GET api/call/upload/progress/<upload_id>/ 查。
+    """
+    target_user, err = _upload_target(request, request.query_params.get('elder_id'))
+    if err:
+        return err
+    upload_id = (request.query_params.get('upload_id') or '').strip()[:64] or None
+
+    stream = request.stream
+    if stream is None:
+        return Response({"error": "no records"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        stats = call_ingest.ingest(
+            target_user, call_ingest.iter_records(stream, request.content_type), upload_id=upload_id,
+        )
+    except call_ingest.IngestError as e:
+        return Response(
+            {"error": str(e), "upload_id": upload_id, **getattr(e, "stats", {}), "done": False},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return Response(
+        {"upload_id": upload_id, **stats, "done": True},
+        status=status.HTTP_201_CREATED if stats["saved"] else status.HTTP_200_OK,
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def call_upload_progress(request, upload_id):
+    target_user, err = _upload_target(request, request.query_params.get('elder_id'))
+    if err:
+        return err
+    progress = call_ingest.get_progress(target_user.pk, upload_id)
+    if progress is None:
+        return Response({"error": "upload not found"}, status=status.HTTP_404_NOT_FOUND)
+    return Response({"upload_id": upload_id, **progress})
+
+
+# ====== API：查詢 ======
+_CALL_STATUSES = {code for code, _label in CallRecord.CALL_STATUS_CHOICES}
+_CALL_FIELDS = ('CallId', 'UserId', 'PhoneName', 'Phone', 'PhoneTime', 'status', 'duration_sec', 'IsScam')
+
+
+def _encode_call_cursor(phone_time, call_id):
+    raw = json.dumps([phone_time.isoformat(), call_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_call_cursor(cursor):
+    phone_time, call_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return datetime.fromisoformat(phone_time), int(call_id)
+
+
+def _call_row(row):
+    """values_list 的一列 → 與 CallRecord.to_dict 相同的輸出"""
+    call_id, user_id, name, phone, phone_time, call_status, duration, is_scam = row
+    return {
+        'CallId': call_id,
+        'UserId': user_id,
+        'PhoneName': name,
+        'Phone': phone,
+        'PhoneTime': phone_time.isoformat(),                       # UTC ISO
+        'PhoneTime_tw': phone_time.astimezone(TAIPEI).isoformat(), # 台灣 ISO
+        'status': call_status,
+        'duration_sec': duration,
+        'IsScam': is_scam,
+    }
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])  # 確保用戶已經認證
+def get_call_records(request, elder_id):
+    """
+    長者的通話紀錄，新到舊（PhoneTime, CallId），走 (UserId, PhoneTime) 索引。
+    query：
+      - page_size：預設 100，上限 500
+      - cursor：上一頁回應的 X-Next-Cursor，接著拿更舊的
+      - status：INCOMING,MISSED,...（逗號分隔）
+      - is_scam：true / false
+      - since / until：PhoneTime 範圍 [since, until)；ISO、epoch 或台灣時間字串
+      - after_id：只拿 CallId 比這個大的（上次看到之後才上傳的），「有沒有新的」刷新用
+    回傳本體仍是 list（與舊版相同欄位），還有下一頁時在 X-Next-Cursor 回傳 cursor。
+    """
+    params = request.query_params
+
+    # 本人或同家庭才可查
+    if elder_id != request.user.pk:
+        family = list(User.objects.filter(pk=elder_id).values_list('FamilyID_id', flat=True))
+        if not family:
+            return Response({'error': '使用者不存在'}, status=status.HTTP_404_NOT_FOUND)
+        if family[0] is None or family[0] != request.user.FamilyID_id:
+            return Response({'error': '無權限查詢此用戶'}, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        page_size = max(min(int(params.get('page_size', 100)), 500), 1)
+    except ValueError:
+        return Response({'error': 'page_size 必須是整數'}, status=status.HTTP_400_BAD_REQUEST)
+
+    records = CallRecord.objects.filter(UserId_id=elder_id)
+
+    if params.get('status'):
+        statuses = {s.strip().upper() for s in params['status'].split(',') if s.strip()}
+        unknown = statuses - _CALL_STATUSES
+        if unknown:
+            return Response({'error': f"status 不支援：{', '.join(sorted(unknown))}"}, status=status.HTTP_400_BAD_REQUEST)
+        records = records.filter(status__in=statuses)
+
+    is_scam = params.get('is_scam')
+    if is_scam not in (None, ''):
+        if is_scam.lower() not in ('true', 'false', '1', '0'):
+            return Response({'error': 'is_scam 必須是 true 或 false'}, status=status.HTTP_400_BAD_REQUEST)
+        records = records.filter(IsScam=is_scam.lower() in ('true', '1'))
+
+    for key, lookup in (('since', 'PhoneTime__gte'), ('until', 'PhoneTime__lt')):
+        if params.get(key):
+            at = parse_timestamp(params[key])
+            if at is None:
+                return Response({'error': f'{key} 時間格式錯誤'}, status=status.HTTP_400_BAD_REQUEST)
+            records = records.filter(**{lookup: at})
+
+    if params.get('after_id'):
+        try:
+            records = records.filter(CallId__gt=int(params['after_id']))
+        except ValueError:
+            return Response({'error': 'after_id 必須是整數'}, status=status.HTTP_400_BAD_REQUEST)
+
+    cursor = params.get('cursor')
+    if cursor:
+        try:
+            before_time, before_id = _decode_call_cursor(cursor)
+        except (ValueError, TypeError):
+            return Response({'error': 'cursor 格式錯誤'}, status=status.HTTP_400_BAD_REQUEST)
+        records = records.filter(Q(PhoneTime__lt=before_time) | Q(PhoneTime=before_time, CallId__lt=before_id))
+
+    rows = list(records.order_by('-PhoneTime', '-CallId').values_list(*_CALL_FIELDS)[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    response = Response([_call_row(row) for row in rows])
+    if has_more:
+        response['X-Next-Cursor'] = _encode_call_cursor(rows[-1][4], rows[-1][0])
+    return response
+
+
+# 新增詐騙資料表
+def add_scam_from_callrecord(request):
+    """
+    測試用：把固定的一支電話加入 Scam。
+    注意：Scam model 只有 Phone(FK) 與 Category，不能塞其他欄位。
+    """
+    phone_number = "0905544552"
+
+    call_record = CallRecord.objects.filter(Phone=phone_number).order_by('-PhoneTime').first()
+    if not call_record:
+        # 找不到就「建立一筆 CallRecord」再關聯（你也可以改成直接回 404）
+        call_record = CallRecord.objects.create(
+            Phone=phone_number,
+            PhoneName="未知來電",
+            PhoneTime=timezone.now(),
+        )
+
+    Scam.objects.create(
+        Phone=call_record,         # 外鍵要放 CallRecord 物件（或 Phone_id=call_record.pk）
+        Category="詐騙",
+    )
+    return JsonResponse({"message": f"電話號碼 {phone_number} 已成功新增到詐騙資料表"}, status=200)
+
+@api_view(['POST'])
+@permission_classes([AllowAny])   
+def scam_check_bulk(request):
+    raw_list = request.data.get('phones') or []
+    phones = [normalize_phone(x) for x in raw_list if x]
+    if not phones:
+        return Response({"matches": {}}, status=status.HTTP_200_OK)
+
+    # 取每支電話「最新一筆 Scam」的 Category
+    latest_category_subq = Subquery(
+        Scam.objects
+            .filter(Phone__Phone=OuterRef('Phone'))
+            .order_by('-ScamId')              # 以 ScamId 當最新依據；你也可改時間欄位
+            .values('Category')[:1]
+    )
+
+    # 以電話分組，套上最新分類
+    rows = (CallRecord.objects
+            .filter(Phone__in=phones)
+            .values('Phone')                       
+            .annotate(latest_category=latest_category_subq)
+            .filter(latest_category__isnull=False)
+            .values_list('Phone', 'latest_category'))
+
+    matches = {phone: category for phone, category in rows}
+    return Response({"matches": matches}, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@permission_classes([AllowAny])  # 如果需要驗證，改為 IsAuthenticated
+def scam_check(request):
+    phone_number = request.GET.get('phone')
+    
+    if not phone_number:
+        return Response({"error": "缺少電話號碼"}, status=status.HTTP_400_BAD_REQUEST)
+
+    # 格式化並標準化電話號碼
+    phone_number = normalize_phone(phone_number)
+
+    # 取得電話的最新詐騙記錄
+    latest_category_subq = Subquery(
+        Scam.objects
+            .filter(Phone__Phone=OuterRef('Phone'))
+            .order_by('-ScamId')  # 按照 ScamId 來找最新的
+            .values('Category')[:1]
+    )
+
+    # 查詢電話號碼是否為詐騙
+    rows = (CallRecord.objects
+            .filter(Phone=phone_number)
+            .annotate(latest_category=latest_category_subq)
+            .filter(latest_category__isnull=False)
+            .values('Phone', 'latest_category'))
+
+    # 如果該電話號碼在 Scam 表中有詐騙記錄，返回結果
+    if rows:
+        phone = rows[0]['Phone']
+        category = rows[0]['latest_category']
+        return Response({"phone": phone, "category": category}, status=status.HTTP_200_OK)
+    
+    # 如果找不到該電話的詐騙記錄，返回未找到
+    return Response({"phone": phone_number, "category": "未檢出詐騙"}, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])  # 若要驗證可改回 IsAuthenticated
+def scam_add(request):
+    """
+    支援兩種傳法：
+      1) { "Phone": "0905544552", "Category": "詐騙" }
+         → 自動找/建 CallRecord 再關聯
+      2) { "call_id": 123, "Category": "詐騙" }
+         → 直接綁既有的 CallRecord
+    """
+    phone = (request.data.get("Phone") or "").strip()
+    call_id = request.data.get("call_id")
+    category = (request.data.get("Category") or "詐騙").strip()[:10]
+
+    if not phone and not call_id:
+        return Response({"error": "缺少 Phone 或 call_id，至少擇一"}, status=status.HTTP_400_BAD_REQUEST)
+
+    # 取得/建立 CallRecord
+    if call_id:
+        try:
+            call = CallRecord.objects.get(pk=call_id)
+        except CallRecord.DoesNotExist:
+            return Response({"error": f"CallRecord(id={call_id}) 不存在"}, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        # ⚠️ 這裡要用的是 `phone`，不是 phone_number（phone_number 在另一個函式才有）
+        call = (CallRecord.objects
+                .filter(Phone=phone)
+                .order_by('-PhoneTime')
+                .first())
+        if not call:
+            # 找不到就建立一筆（如果你不想自動建立，改成回 404 即可）
+            call = CallRecord.objects.create(
+                Phone=phone,
+                PhoneName="未知來電",
+                PhoneTime=timezone.now()
+            )
+
+    scam = Scam.objects.create(
+        Phone=call,          # 或寫 Phone_id=call.pk
+        Category=category
+    )
+
+    return Response({
+        "message": "Scam 新增成功",
+        "ScamId": scam.ScamId,
+        "Category": scam.Category,
+        "CallRecord": {
+            "CallId": getattr(call, 'CallId', getattr(call, 'id', None)),
+            "Phone": call.Phone,
+            "PhoneName": getattr(call, 'PhoneName', None),
+            "PhoneTime": getattr(call, 'PhoneTime', None),
+        }
+    }, status=status.HTTP_201_CREATED)
+
@@ -0,0 +1,226 @@
+# mysite/views/fit.py
+# 步數上傳與查詢
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.db.models import Avg, Count, Max, Sum
+from django.db.models.functions import TruncMonth, TruncWeek, TruncYear
+
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from mysite.models import FitData
+from mysite.services.upsert import upsert
+
+User = get_user_model()
+
+class FitDataAPI(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        user = request.user
+        steps = request.data.get('steps')
+        date_str = request.data.get('date')  # ✅ 改收 date
+
+        if steps is None or not date_str:
+            return Response({'error': '缺少步數或日期'}, status=400)
+
+        try:
+            date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
+        except ValueError:
+            return Response({'error': '日期格式錯誤，應為 YYYY-MM-DD'}, status=400)
+
+        try:
+            steps = int(steps)
+        except (TypeError, ValueError):
+            return Response({'error': '步數必須是整數'}, status=400)
+
+        # ✅ 同一天只有一筆：upsert（已有就更新，見 services/upsert.py）
+        result = upsert(
+            FitData,
+            [FitData(UserID=user, date=date_obj, steps=steps)],
+            unique_fields=['UserID', 'date'],
+            update_fields=['steps', 'updated_at'],
+            compare_fields=['steps'],
+        )
+
+        if result.created:
+            return Response({'message': '✅ 新增成功'})
+        if result.updated:
+            return Response({'message': '✅ 已更新當日步數'})
+        return Response({'message': '🟡 當日步數相同，未更新'})
+
+
+# 查詢步數（用 date 欄位）
+class FitDataByDateAPI(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        # 1) 取得參數
+        date_str = request.query_params.get('date')      # 必填：YYYY-MM-DD
+        user_id = request.query_params.get('user_id')    # 選填：查指定使用者
+
+        if not date_str:
+            return Response({'error': '缺少日期參數 date（YYYY-MM-DD）'}, status=400)
+
+        # 2) 解析日期
+        try:
+            target_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+        except ValueError:
+            return Response({'error': '日期格式錯誤，應為 YYYY-MM-DD'}, status=400)
+
+        # 3) 決定目標使用者：有 user_id 就查該人，否則查登入者
+        if user_id:
+            try:
+                uid = int(user_id)
+            except (TypeError, ValueError):
+                return Response({'error': 'user_id 必須為整數'}, status=400)
+
+            try:
+                # 用 get_user_model() 比較穩；一般用 pk/id 查就好
+                target_user = User.objects.get(pk=uid)
+            except User.DoesNotExist:
+                return Response({'error': '查無此使用者'}, status=404)
+        else:
+            target_user = request.user
+
+        # 4) 以 date 精準查詢（(UserID, date) 唯一，最多一筆）
+        record = FitData.objects.filter(UserID=target_user, date=target_date).first()
+
+        if not record:
+            return Response({'message': '當日無步數資料'}, status=404)
+
+        # 5) 回傳結果（保持簡潔）
+        return Response({
+            'user_id': getattr(target_user, 'pk', None),
+            'date': record.date.isoformat(),
+            'steps': record.steps,
+            'created_at': getattr(record, 'created_at', None),
+            'updated_at': getattr(record, 'updated_at', None),
+        })
+
+
+
+def _parse_steps_item(item):
+    if not isinstance(item, dict):
+        raise ValueError('每筆必須是物件')
+    try:
+        date_obj = datetime.strptime(str(item.get('date', '')), '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError('日期格式錯誤，應為 YYYY-MM-DD')
+    try:
+        steps = int(item.get('steps'))
+    except (TypeError, ValueError):
+        raise ValueError('步數必須是整數')
+    if steps < 0:
+        raise ValueError('步數不可為負數')
+    return date_obj, steps
+
+
+# 批次上傳步數（手機從 Google Fit 一次同步多天）
+class FitDataBulkAPI(APIView):
+    """
+    POST {"items": [{"date": "YYYY-MM-DD", "steps": 1234}, ...]}（或直接送陣列）
+    同一天出現多次以最後一筆為準；整批一個 upsert 寫入，格式錯誤的放在 rejected。
+    """
+    permission_classes = [IsAuthenticated]
+    MAX_BATCH = 1000
+
+    def post(self, request):
+        items = request.data.get('items') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list):
+            return Response({'error': 'items 必須是陣列'}, status=400)
+        if len(items) > self.MAX_BATCH:
+            return Response({'error': f'一次最多 {self.MAX_BATCH} 筆'}, status=400)
+
+        by_date, rejected = {}, []
+        for i, item in enumerate(items):
+            try:
+                date_obj, steps = _parse_steps_item(item)
+            except ValueError as e:
+                rejected.append({'index': i, 'error': str(e)})
+                continue
+            by_date[date_obj] = FitData(UserID=request.user, date=date_obj, steps=steps)
+
+        result = upsert(
+            FitData,
+            sorted(by_date.values(), key=lambda o: o.date),
+            unique_fields=['UserID', 'date'],
+            update_fields=['steps', 'updated_at'],
+            compare_fields=['steps'],
+        )
+        return Response({
+            'received': len(items),
+            'created': len(result.created),
+            'updated': len(result.updated),
+            'unchanged': len(result.unchanged),
+            'rejected': rejected,
+        })
+
+
+# 步數區間 + 週 / 月 / 年彙總（可一次查多位家人）
+class FitDataRangeAPI(APIView):
+    """
+    GET ?start=YYYY-MM-DD&end=YYYY-MM-DD[&user_id=1,2][&rollup=week,month,year]
+    user_id 不帶就是自己；查別人必須同一個家庭。
+    每日序列一次查詢，每一種彙總（總和、平均、天數、最大）各一次 DB 端 GROUP BY。
+    """
+    permission_classes = [IsAuthenticated]
+    MAX_DAYS = 366 * 3
+    ROLLUPS = {'week': TruncWeek, 'month': TruncMonth, 'year': TruncYear}
+
+    def get(self, request):
+        try:
+            start = datetime.strptime(request.query_params.get('start', ''), '%Y-%m-%d').date()
+            end = datetime.strptime(request.query_params.get('end', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return Response({'error': 'start / end 格式錯誤，應為 YYYY-MM-DD'}, status=400)
+        if end < start:
+            return Response({'error': 'end 不可早於 start'}, status=400)
+        if (end - start).days >= self.MAX_DAYS:
+            return Response({'error': f'區間最多 {self.MAX_DAYS} 天'}, status=400)
+
+        rollups = [r for r in request.query_params.get('rollup', 'week,month').split(',') if r]
+        unknown = [r for r in rollups if r not in self.ROLLUPS]
+        if unknown:
+            return Response({'error': f'不支援的 rollup：{", ".join(unknown)}（可用 week / month / year）'}, status=400)
+
+        raw_ids = ','.join(request.query_params.getlist('user_id'))
+        try:
+            user_ids = sorted({int(x) for x in raw_ids.split(',') if x.strip()}) or [request.user.pk]
+        except ValueError:
+            return Response({'error': 'user_id 必須為整數'}, status=400)
+
+        others = [uid for uid in user_ids if uid != request.user.pk]
+        if others:
+            family = dict(User.objects.filter(pk__in=others).values_list('pk', 'FamilyID_id'))
+            missing = [uid for uid in others if uid not in family]
+            if missing:
+                return Response({'error': '查無此使用者', 'user_ids': missing}, status=404)
+            my_family = request.user.FamilyID_id
+            if my_family is None or any(fid != my_family for fid in family.values()):
+                return Response({'error': '無權限查詢此用戶'}, status=403)
+
+        records = FitData.objects.filter(UserID_id__in=user_ids, date__range=(start, end))
+        results = {uid: {'user_id': uid, 'daily': [], **{r: [] for r in rollups}} for uid in user_ids}
+
+        for row in records.order_by('UserID', 'date').values('UserID_id', 'date', 'steps'):
+            results[row['UserID_id']]['daily'].append({'date': row['date'], 'steps': row['steps']})
+
+        for name in rollups:
+            rows = (records
+                    .annotate(period=self.ROLLUPS[name]('date'))
+                    .values('UserID_id', 'period')
+                    .annotate(total=Sum('steps'), avg=Avg('steps'), days=Count('id'), max=Max('steps'))
+                    .order_by('UserID_id', 'period'))
+            for row in rows:
+                results[row['UserID_id']][name].append({
+                    'period_start': row['period'],
+                    'total': row['total'],
+                    'avg': round(row['avg'], 1),
+                    'days': row['days'],
+                    'max': row['max'],
+                })
+
+        return Response({'start': start, 'end': end, 'results': list(results.values())})
@@ -0,0 +1,444 @@
+# mysite/views/health.py
+# 血壓辨識（YOLO → GPT fallback）與血壓查詢
+import base64
+import re
+from datetime import datetime, timezone as dt_timezone
+
+import pytz
+from django.db.models import Avg, Count, Max, Min, Q
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+
+from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from mysite.models import HealthCare, User
+from mysite.services import clients, ocr_cache
+from mysite.services.blood_inference import VALID_RANGES, detect_readings
+from mysite.services.image_prep import prepare_image
+from mysite.services.timeparse import TAIPEI as TAIPEI_TZ, get_tz, parse_timestamp
+from mysite.services.upsert import upsert
+
+# YOLO 模型不在 web worker 裡，推論交給 services/blood_inference（本機 pool 或共用的 yolo_server）；
+# OpenAI client 由 services/clients 共用
+
+
+def parse_to_utc_minute(value) -> datetime:
+    """
+    epoch（秒或毫秒）/ ISO / 無時區字串（視為 Asia/Taipei）/ datetime
+    → UTC aware、分鐘精度；解析不了就用現在（services/timeparse.py）
+    """
+    return parse_timestamp(value, minute=True) or timezone.now().replace(second=0, microsecond=0)
+
+def dt_key_minute(dt: datetime) -> str:
+    """
+    產生「分鐘精度」鍵值（UTC），用於去重：
+    'YYYY-MM-DDTHH:MM'
+    """
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M')
+
+
+def read_image_bytes(request):
+    if "image" in request.FILES:
+        return request.FILES["image"].read()
+    if "image_base64" in request.data:
+        b64 = request.data["image_base64"]
+        if "," in b64:
+            b64 = b64.split(",", 1)[1]
+        return base64.b64decode(b64)
+    raise ValueError("need_image_or_base64")
+
+
+def recognize_readings(image_bytes):
+    """
+    位元組 → {systolic, diastolic, pulse}。
+    同一張圖（SHA-256 相同）直接回快取，不解碼、不跑 YOLO / GPT。
+    """
+    cache_key = ocr_cache.image_key(ocr_cache.BLOOD, image_bytes)
+    cached = ocr_cache.get_result(cache_key)
+    if cached is not None:
+        return cached
+
+    prepared = prepare_image(image_bytes)
+
+    # YOLO 辨識（region + digits 交給推論 pool；讀不完整/逾時/出錯才走 GPT fallback）
+    try:
+        results = detect_readings(prepared.image)
+
+        if any(v is None for v in results.values()):
+            raise ValueError("YOLO incomplete")
+
+        for k, (lo, hi) in VALID_RANGES.items():
+            if not (lo <= results[k] <= hi):
+                raise ValueError("YOLO out of range")
+
+    except Exception:
+        results = call_gpt_fallback(prepared.jpeg_b64)
+
+    ocr_cache.set_result(cache_key, results)
+    return results
+
+
+def call_gpt_fallback(image_b64: str):
+    """呼叫 GPT 辨識血壓數字"""
+    response = clients.openai_client().chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": "你是一個醫療助手，請只輸出格式：收縮壓=<數字>, 舒張壓=<數字>, 心跳=<數字>"},
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": "請讀出這張血壓計上的數字"},
+                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{image_b64}"}}
+                ]
+            }
+        ],
+        max_tokens=200,
+    )
+    result_text = response.choices[0].message.content.strip()
+    nums = re.findall(r"(\d+)", result_text)
+    if len(nums) < 3:
+        raise ValueError(f"GPT parse fail: {result_text}")
+    return {
+        "systolic": int(nums[0]),
+        "diastolic": int(nums[1]),
+        "pulse": int(nums[2]),
+    }
+
+
+TAIPEI = pytz.timezone("Asia/Taipei")
+
+# 同一人、同一台北日、同一時段只有一筆（uniq_user_localdate_period），留量測時間最晚的那筆：
+# DB 裡已經比較新的不會被離線補傳的舊量測蓋掉
+HEALTHCARE_UPSERT = dict(
+    unique_fields=["UserID", "LocalDate", "Period"],
+    update_fields=["Systolic", "Diastolic", "Pulse", "CapturedAt", "DeviceTZ", "EpochMs"],
+    compare_fields=["Systolic", "Diastolic", "Pulse"],
+    newer_field="CapturedAt",
+)
+
+class BloodYOLOView(APIView):
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request, *args, **kwargs):
+        try:
+            # 1) 取圖
+            image_bytes = read_image_bytes(request)
+
+            # 2) 取前端送來的時間（ISO/UTC）。若沒有，就以現在時間
+            ts_str  = request.POST.get("timestamp")  # e.g. "2025-09-20T14:35:32.343Z"
+            tz_str  = request.POST.get("tz")         # e.g. "Asia/Taipei"
+            epoch_ms = request.POST.get("epoch_ms")  # e.g. "1758378932343"
+
+            # 2a) 解析成 aware datetime（以 UTC 為主；沒帶時區的照 tz，沒給 tz 視為 UTC）
+            naive_tz = (get_tz(tz_str) if tz_str else None) or dt_timezone.utc
+            captured_at = (
+                parse_timestamp(ts_str, default_tz=naive_tz)
+                or parse_timestamp(epoch_ms)
+                or timezone.now()  # 後備：沒有給就用現在（UTC）
+            )
+
+            # 2b) 算出台北本地時間 & 本地「日期」與「早/晚」
+            captured_at_taipei = captured_at.astimezone(TAIPEI)
+            local_date = captured_at_taipei.date()
+            period = "morning" if captured_at_taipei.hour < 12 else "evening"
+
+            # 3) 辨識（快取 → YOLO → GPT fallback）
+            results = recognize_readings(image_bytes)
+
+            # 4) Upsert：同一人、同一台北日、同一時段 若已有 → 更新；否則建立（services/upsert）
+            obj = HealthCare(
+                UserID=request.user,
+                LocalDate=local_date,
+                Period=period,
+                Systolic=results["systolic"],
+                Diastolic=results["diastolic"],
+                Pulse=results["pulse"],
+                CapturedAt=captured_at,             # 建議存 UTC
+                DeviceTZ=tz_str,
+                EpochMs=epoch_ms,
+            )
+            result = upsert(HealthCare, [obj], **HEALTHCARE_UPSERT)
+            created = bool(result.created)
+            if result.skipped:
+                message = "同時段已有較新的紀錄，未覆蓋"
+            else:
+                message = ("新增" if created else "已更新") + ("早上" if obj.Period == "morning" else "晚上") + "紀錄"
+
+            return Response({
+                "ok": True,
+                "parsed": results,
+                "health_id": obj.HealthID,
+                "period": obj.Period,
+                "local_date": str(obj.LocalDate),                     # 台北的日期（字串）
+                "captured_at_utc": obj.CapturedAt.isoformat(),        # UTC
+                "captured_at_taipei": captured_at_taipei.strftime("%Y-%m-%d %H:%M:%S"),
+                "created": created,                                   # True=新增 / False=更新
+                "skipped": bool(result.skipped),                      # True=DB 裡已有較新的，沒寫入
+                "message": message,
+            }, status=200)
+
+        except Exception as e:
+            return Response({"ok": False, "error": str(e)}, status=500)
+
+#查血壓
+class HealthCareByDateAPI(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+        date_str = request.query_params.get('date')
+        user_id = request.query_params.get('user_id')
+
+        if not date_str:
+            return Response({'error': '缺少日期參數'}, status=400)
+
+        try:
+            target_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+        except ValueError:
+            return Response({'error': '日期格式錯誤，應為 YYYY-MM-DD'}, status=400)
+
+        if user_id:
+            try:
+                user_id = int(user_id)
+                target_user = User.objects.get(UserID=user_id)
+            except (ValueError, TypeError):
+                return Response({'error': 'user_id 格式錯誤'}, status=400)
+            except User.DoesNotExist:
+                return Response({'error': '查無此使用者'}, status=404)
+        else:
+            target_user = user
+
+        # 撈當日兩筆
+        records = HealthCare.objects.filter(
+            UserID=target_user,
+            LocalDate=target_date
+        )
+
+        morning = records.filter(Period="morning").first()
+        evening = records.filter(Period="evening").first()
+
+        return Response({
+            "date": date_str,
+            "morning": {
+                "systolic": morning.Systolic if morning else None,
+                "diastolic": morning.Diastolic if morning else None,
+                "pulse": morning.Pulse if morning else None,
+                "captured_at": morning.CapturedAt if morning else None,
+            } if morning else None,
+            "evening": {
+                "systolic": evening.Systolic if evening else None,
+                "diastolic": evening.Diastolic if evening else None,
+                "pulse": evening.Pulse if evening else None,
+                "captured_at": evening.CapturedAt if evening else None,
+            } if evening else None,
+        })
+
+
+def _bp_stats():
+    """血壓統計欄位（DB 端計算）"""
+    return {
+        'count': Count('HealthID'),
+        'systolic_avg': Avg('Systolic'),
+        'systolic_min': Min('Systolic'),
+        'systolic_max': Max('Systolic'),
+        'diastolic_avg': Avg('Diastolic'),
+        'diastolic_min': Min('Diastolic'),
+        'diastolic_max': Max('Diastolic'),
+        'pulse_avg': Avg('Pulse'),
+        'pulse_min': Min('Pulse'),
+        'pulse_max': Max('Pulse'),
+    }
+
+
+def _round_avgs(row):
+    return {k: (round(v, 1) if k.endswith('_avg') and v is not None else v) for k, v in row.items()}
+
+
+class HealthCareRangeAPI(APIView):
+    """
+    區間查詢：?start=YYYY-MM-DD&end=YYYY-MM-DD[&user_id=]（含頭尾，最多 366 天）
+    一次回傳區間內所有量測，以及 DB 算好的每日 / 每週平均、最小、最大與早晚分開的統計，
+    週 / 月圖表不用再一天打一次 by-date。
+    """
+    permission_classes = [IsAuthenticated]
+    MAX_DAYS = 366
+
+    def get(self, request):
+        try:
+            start = datetime.strptime(request.query_params.get('start', ''), '%Y-%m-%d').date()
+            end = datetime.strptime(request.query_params.get('end', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return Response({'error': 'start / end 格式錯誤，應為 YYYY-MM-DD'}, status=400)
+        if end < start:
+            return Response({'error': 'end 不可早於 start'}, status=400)
+        if (end - start).days >= self.MAX_DAYS:
+            return Response({'error': f'區間最多 {self.MAX_DAYS} 天'}, status=400)
+
+        user_id = request.query_params.get('user_id')
+        if user_id:
+            try:
+                target_user = User.objects.only('UserID', 'FamilyID').get(UserID=int(user_id))
+            except (ValueError, TypeError):
+                return Response({'error': 'user_id 格式錯誤'}, status=400)
+            except User.DoesNotExist:
+                return Response({'error': '查無此使用者'}, status=404)
+            # 本人或同家庭才可查
+            if target_user.pk != request.user.pk and (
+                    target_user.FamilyID_id is None or target_user.FamilyID_id != request.user.FamilyID_id):
+                return Response({'error': '無權限查詢此用戶'}, status=403)
+        else:
+            target_user = request.user
+
+        records = HealthCare.objects.filter(UserID=target_user, LocalDate__range=(start, end))
+
+        readings = [{
+            'date': r['LocalDate'],
+            'period': r['Period'],
+            'systolic': r['Systolic'],
+            'diastolic': r['Diastolic'],
+            'pulse': r['Pulse'],
+            'captured_at': r['CapturedAt'],
+        } for r in records.order_by('CapturedAt')
+                          .values('LocalDate', 'Period', 'Systolic', 'Diastolic', 'Pulse', 'CapturedAt')]
+
+        # 每日：整體統計 + 早 / 晚各自的值（同一天同時段只有一筆）
+        split = {}
+        for period in ('morning', 'evening'):
+            only = Q(Period=period)
+            split[f'{period}_systolic'] = Max('Systolic', filter=only)
+            split[f'{period}_diastolic'] = Max('Diastolic', filter=only)
+            split[f'{period}_pulse'] = Max('Pulse', filter=only)
+        daily = []
+        for row in records.values('LocalDate').annotate(**_bp_stats(), **split).order_by('LocalDate'):
+            row = _round_avgs(row)
+            day = {'date': row.pop('LocalDate')}
+            for period in ('morning', 'evening'):
+                values = {k: row.pop(f'{period}_{k}') for k in ('systolic', 'diastolic', 'pulse')}
+                day[period] = values if values['systolic'] is not None else None
+            day.update(row)
+            daily.append(day)
+
+        weekly = [
+            {'week_start': row.pop('week'), **_round_avgs(row)}
+            for row in records.annotate(week=TruncWeek('LocalDate'))
+                              .values('week').annotate(**_bp_stats()).order_by('week')
+        ]
+
+        by_period = {'morning': None, 'evening': None}
+        for row in records.values('Period').annotate(**_bp_stats()):
+            period = row.pop('Period')
+            by_period[period] = _round_avgs(row)
+
+        return Response({
+            'user_id': target_user.UserID,
+            'start': start,
+            'end': end,
+            'readings': readings,
+            'daily': daily,
+            'weekly': weekly,
+            'by_period': by_period,
+            'summary': _round_avgs(records.aggregate(**_bp_stats())),
+        })
+
+
+def _captured_at(item):
+    """
+    離線量測的時間：epoch_ms 優先，其次 ISO timestamp；都沒有回 None。
+    timestamp 沒帶時區時照這筆的 tz 解讀（與 BloodYOLOView 相同），沒給 tz 視為台北。
+    """
+    epoch_ms = item.get('epoch_ms')
+    if epoch_ms not in (None, ''):
+        return datetime.fromtimestamp(int(epoch_ms) / 1000.0, tz=dt_timezone.utc)
+    ts = item.get('timestamp')
+    if ts:
+        tz_str = item.get('tz')
+        naive_tz = get_tz(tz_str) if tz_str else TAIPEI_TZ
+        if naive_tz is None:
+            raise ValueError(f'tz 不認得：{tz_str}')
+        dt = parse_timestamp(ts, default_tz=naive_tz)
+        if dt is None:
+            raise ValueError(f'timestamp 格式錯誤：{ts}')
+        return dt
+    return None
+
+
+def _reading_value(item, key, required=True):
+    value = item.get(key)
+    if value in (None, ''):
+        if required:
+            raise ValueError(f'缺少 {key}')
+        return None
+    value = int(value)
+    lo, hi = VALID_RANGES[key]
+    if not (lo <= value <= hi):
+        raise ValueError(f'{key} 超出範圍（{lo}~{hi}）：{value}')
+    return value
+
+
+class HealthCareSyncAPI(APIView):
+    """
+    離線補傳：一次送多筆已辨識好的血壓（JSON）
+        {"readings": [{"systolic": 128, "diastolic": 82, "pulse": 70,
+                       "epoch_ms": 1758378932343 | "timestamp": "2025-09-20T14:35:32Z", "tz": "Asia/Taipei"}, ...]}
+    規則與 BloodYOLOView 相同：同一人、同一台北日、同一時段只留一筆，留量測時間最晚的
+    （批內與 DB 裡已有的都一樣比 CapturedAt；比 DB 舊的算在 skipped）。
+    整批用 services/upsert 一次寫入（uniq_user_localdate_period）；
+    格式錯誤的筆數放在 rejected，不影響其他筆。
+    """
+    permission_classes = [IsAuthenticated]
+    MAX_BATCH = 500
+
+    def post(self, request):
+        items = request.data.get('readings') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list):
+            return Response({'ok': False, 'error': 'readings 必須是陣列'}, status=400)
+        if len(items) > self.MAX_BATCH:
+            return Response({'ok': False, 'error': f'一次最多 {self.MAX_BATCH} 筆'}, status=400)
+
+        rows, rejected = {}, []
+        for i, item in enumerate(items):
+            try:
+                if not isinstance(item, dict):
+                    raise ValueError('每筆必須是物件')
+                captured_at = _captured_at(item)
+                if captured_at is None:
+                    raise ValueError('缺少 epoch_ms 或 timestamp')
+                obj = HealthCare(
+                    UserID=request.user,
+                    Systolic=_reading_value(item, 'systolic'),
+                    Diastolic=_reading_value(item, 'diastolic'),
+                    Pulse=_reading_value(item, 'pulse', required=False),
+                    CapturedAt=captured_at,
+                    DeviceTZ=item.get('tz'),
+                    EpochMs=item.get('epoch_ms') or int(captured_at.timestamp() * 1000),
+                )
+            except (TypeError, ValueError, OverflowError, OSError) as e:
+                rejected.append({'index': i, 'error': str(e)})
+                continue
+
+            local = captured_at.astimezone(TAIPEI)
+            obj.LocalDate = local.date()
+            obj.Period = 'morning' if local.hour < 12 else 'evening'
+            key = (obj.LocalDate, obj.Period)
+            # 同一批裡同一時段有多筆：留拍得最晚的（同一個 INSERT 不能更新同一列兩次）
+            if key not in rows or rows[key].CapturedAt <= captured_at:
+                rows[key] = obj
+
+        objs = sorted(rows.values(), key=lambda o: o.CapturedAt)
+        result = upsert(HealthCare, objs, **HEALTHCARE_UPSERT)
+
+        return Response({
+            'ok': True,
+            'received': len(items),
+            'written': len(objs) - len(result.skipped),
+            'created': len(result.created),
+            'updated': len(result.updated) + len(result.unchanged),
+            'skipped': len(result.skipped),
+            'rejected': rejected,
+        }, status=200)
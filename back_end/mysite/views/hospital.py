@@ -0,0 +1,133 @@
+# mysite/views/hospital.py
+# 看診紀錄（長者本人或同家庭家人代為操作）
+from django.shortcuts import get_object_or_404
+
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from mysite.models import Hos, User
+
+
+def _is_elder_user(u):
+    """
+    認定使用者是否為長者：
+    1) 明確的布林欄位 is_elder（若你有）
+    2) 或以資料設計推斷：長者常態上會有 RelatedID 指向照護者
+    依你的實作擇一或兩者併用
+    """
+    if hasattr(u, 'is_elder'):
+        return bool(getattr(u, 'is_elder'))
+    # 若沒有 is_elder 欄位，改用 RelatedID 是否存在來推斷
+    return getattr(u, 'RelatedID_id', None) is not None
+
+
+def _resolve_target_user_id(request):
+    """
+    解析本次操作的【長者】UserID：
+    - 長者登入：就是自己
+    - 家人登入：必須帶 ?user_id= 或 body 的 elder_id/user_id
+      -> 僅接受「長者」ID；若帶到家人 ID，嘗試映射到其所照護的長者（單一長者時）
+      -> 通過授權：同家庭 或 長者.RelatedID == 自己
+    """
+    me = request.user
+
+    # 1) 長者登入：直接回自己
+    if _is_elder_user(me):
+        return getattr(me, 'UserID', None) or getattr(me, 'pk', None)
+
+    # 2) 家人登入：讀取參數
+    raw = (
+        request.query_params.get('user_id')
+        or request.data.get('elder_id')
+        or request.data.get('user_id')
+    )
+    if not raw:
+        return None
+
+    try:
+        uid = int(raw)
+    except (TypeError, ValueError):
+        return None
+
+    # 先抓這個 uid 對應的使用者
+    target = get_object_or_404(User, UserID=uid)
+
+    # 如果傳來的是家人 ID（非長者），嘗試映射成他所照護的長者（常見一對一）
+    if not _is_elder_user(target):
+        # 依你的資料關係：長者.RelatedID 指向家人
+        elder_qs = User.objects.filter(RelatedID_id=target.UserID)
+        # 一對一情境下可取 first；若可能多位長者，請改成必要時回 400 並讓前端明確指定
+        mapped_elder = elder_qs.first()
+        if mapped_elder:
+            target = mapped_elder
+        else:
+            # 不是長者且無法映射 -> 拒絕，避免把家人當成長者
+            return None
+
+    # 至此，target 已確保為長者
+    # 授權檢查（擇一或都檢）
+    same_family = (
+        getattr(target, 'FamilyID_id', None) and
+        getattr(me, 'FamilyID_id', None) and
+        target.FamilyID_id == me.FamilyID_id
+    )
+    related_to_me = (getattr(target, 'RelatedID_id', None) == getattr(me, 'UserID', None))
+
+    if same_family or related_to_me:
+        return getattr(target, 'UserID', None)
+
+    return None
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def hospital_list(request):
+    target_id = _resolve_target_user_id(request)
+    if not target_id:
+        return Response({"error": "沒有指定有效的長者"}, status=400)
+
+    qs = Hos.objects.filter(UserID_id=target_id).order_by('-ClinicDate')
+    from .serializers import HosSerializer
+    ser = HosSerializer(qs, many=True)
+    return Response(ser.data)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def hospital_create(request):
+    target_id = _resolve_target_user_id(request)
+    if not target_id:
+        return Response({"error": "沒有指定有效的長者"}, status=400)
+
+    data = request.data.copy()
+
+    # 日期只留 YYYY-MM-DD（若你的欄位是 DateField）
+    if isinstance(data.get('ClinicDate'), str) and ' ' in data['ClinicDate']:
+        data['ClinicDate'] = data['ClinicDate'].split(' ')[0]
+
+    from .serializers import HosSerializer
+    ser = HosSerializer(data=data)
+    if ser.is_valid():
+        ser.save(UserID_id=target_id)  # 綁定到長者
+        return Response(ser.data, status=201)
+    return Response(ser.errors, status=400)
+
+
+@api_view(['DELETE'])
+@permission_classes([IsAuthenticated])
+def hospital_delete(request, pk):
+    """
+    刪除看診紀錄：
+    - 老人：可刪自己的
+    - 家人：帶 ?user_id=老人ID，且需通過授權檢查
+    """
+    target_id = _resolve_target_user_id(request)
+    if not target_id:
+        return Response({"error": "沒有指定老人"}, status=400)
+
+    deleted_count, _ = Hos.objects.filter(pk=pk, UserID_id=target_id).delete()
+    if deleted_count == 0:
+        return Response({"error": "找不到資料或無權限刪除"}, status=404)
+
+    return Response({"message": "已刪除"}, status=200)
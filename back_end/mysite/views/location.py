@@ -0,0 +1,177 @@
+# mysite/views/location.py
+# 長者定位上傳、最新位置、家庭位置、歷史軌跡、反查地址
+import functools
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import OuterRef, Subquery
+from django.utils.timezone import now
+
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.throttling import UserRateThrottle
+
+from mysite.models import LocaRecord
+from mysite.permissions import IsElder
+from mysite.serializers import LocationUploadSerializer, LocationLatestSerializer, LocationHistorySerializer
+
+User = get_user_model()
+
+class UploadLocationThrottle(UserRateThrottle):
+    rate = '3/min'  #限制上傳頻率，可調整次數
+
+def _same_family(u1, u2) -> bool:
+    return (
+        getattr(u1, 'FamilyID_id', None) is not None and
+        getattr(u2, 'FamilyID_id', None) is not None and
+        u1.FamilyID_id == u2.FamilyID_id
+    )
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsElder])   # 僅長者可上傳
+@throttle_classes([UploadLocationThrottle])
+def upload_location(request):
+    ser = LocationUploadSerializer(data=request.data, context={'user': request.user})
+    if not ser.is_valid():
+        return Response(ser.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    # log
+    print(f"Serialized data: {ser.validated_data}")
+
+    rec = ser.save()
+    out = LocationLatestSerializer(rec).data  # lat,lon,ts
+    return Response({'ok': True, 'user': request.user.pk, **out}, status=status.HTTP_201_CREATED)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_latest_location(request, user_id: int):
+    # 本人和同家庭才可查訊
+    if request.user.pk == user_id:
+        target = request.user
+    else:
+        try:
+            target = User.objects.get(pk=user_id)
+        except User.DoesNotExist:
+            return Response({'error': '使用者不存在'}, status=status.HTTP_404_NOT_FOUND)
+        if not getattr(target, 'is_elder', False):
+            return Response({'error': '不是長者帳號'}, status=status.HTTP_400_BAD_REQUEST)
+        if not _same_family(request.user, target):
+            return Response({'error': '無權存取'}, status=status.HTTP_403_FORBIDDEN)
+
+    rec = (LocaRecord.objects
+           .filter(UserID=target)
+           .order_by('-Timestamp')
+           .only('Latitude', 'Longitude', 'Timestamp')
+           .first()) #取第一筆資料
+    if not rec:
+        return Response({'error': '尚未最新定位'}, status=status.HTTP_404_NOT_FOUND)
+
+    out = LocationLatestSerializer(rec).data
+    return Response({'ok': True, 'user': target.pk, **out}, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_family_locations(request, family_id: int):
+    # 僅可查詢自己的家庭
+    if request.user.FamilyID_id is None:
+        return Response({'error': '尚未加入任何家庭'}, status=status.HTTP_400_BAD_REQUEST)
+    if request.user.FamilyID_id != family_id:
+        return Response({'error': '無權存取'}, status=status.HTTP_403_FORBIDDEN)
+
+    latest_qs = (LocaRecord.objects
+                 .filter(UserID_id=OuterRef('pk'))
+                 .order_by('-Timestamp'))
+
+    elders = (User.objects
+              .filter(FamilyID_id=family_id, is_elder=True)
+              .annotate(
+                  last_time=Subquery(latest_qs.values('Timestamp')[:1]),
+                  last_lat =Subquery(latest_qs.values('Latitude')[:1]),
+                  last_lon =Subquery(latest_qs.values('Longitude')[:1]),
+              )
+              .filter(last_time__isnull=False)
+              .values('UserID', 'Name', 'Phone', 'last_lat', 'last_lon', 'last_time'))
+    #將查詢結果轉成 JSON 格式
+    results = [{
+        'user': e['UserID'],
+        'name': e['Name'] or e['Phone'],
+        'lat': float(e['last_lat']),
+        'lon': float(e['last_lon']),
+        'ts': e['last_time'],
+    } for e in elders]
+
+    return Response({'ok': True, 'family_id': family_id, 'count': len(results), 'results': results},
+                    status=status.HTTP_200_OK)
+
+
+@functools.lru_cache(maxsize=2048)
+def _google_reverse(lat, lng, lang):
+    r = requests.get(
+        "https://maps.googleapis.com/maps/api/geocode/json",
+        params={"latlng": f"{lat},{lng}", "language": lang, "key": settings.GOOGLE_MAPS_KEY},
+        timeout=8,
+    )
+    j = r.json()
+    print('Google Geocode API 回傳 status:', j.get("status"))  # 可看API錯誤訊息
+    print('實際查詢 lat/lng:', lat, lng)
+
+
+    if j.get("status") == "OK" and j.get("results"):
+        first = j["results"][0]
+        return first.get("formatted_address")  # 取第一筆地址
+
+    return None
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def reverse_geocode(request):
+    lat = request.GET.get("lat")
+    lng = request.GET.get("lng")
+    lang = request.GET.get("lang", "zh-TW")
+    if not (lat and lng):
+        return Response({"error": "lat/lng required"}, status=400)
+    addr = _google_reverse(str(lat), str(lng), lang)
+    return Response({"address": addr})  # 取第一筆地址
+
+
+
+#過去24小時內定位資料
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def location_history(request, elder_id):
+    try:
+        hours = int(request.query_params.get('hours', 24))
+        time_threshold = now() - timedelta(hours=hours)
+
+        # 驗證使用者存在 & 是長者 & 同家庭
+        from django.contrib.auth import get_user_model
+        User = get_user_model()
+        user = request.user
+
+        try:
+            elder = User.objects.get(pk=elder_id)
+        except User.DoesNotExist:
+            return Response({'error': '使用者不存在'}, status=404)
+
+        if not getattr(elder, 'is_elder', False):
+            return Response({'error': '不是長者帳號'}, status=400)
+
+        if not _same_family(user, elder):
+            return Response({'error': '無權存取'}, status=403)
+
+        # 查詢歷史資料
+        queryset = LocaRecord.objects.filter(
+            UserID=elder,
+            Timestamp__gte=time_threshold
+        ).order_by('Timestamp')
+
+        serializer = LocationHistorySerializer(queryset, many=True)
+        return Response(serializer.data)
+
+    except Exception as e:
+        return Response({'error': str(e)}, status=400)
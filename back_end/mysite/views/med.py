@@ -0,0 +1,406 @@
+# mysite/views/med.py
+# 藥單 OCR、服藥、藥單查詢/刪除、用藥時間與提醒
+import base64
+import json
+import uuid
+from datetime import datetime, timedelta
+
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes, authentication_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from mysite.models import Med, MedTimeSetting, OcrJob, ReminderOccurrence, User
+from mysite.serializers import MedSerializer, MedTimeSettingSerializer
+from mysite.services import doses, med_schedule, ocr_jobs, reminder_occurrences
+from mysite.services.prescription_ocr import PrescriptionOcrError, analyze_prescription
+
+
+class OcrAnalyzeView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        print("目前登入的使用者是：", request.user)
+        print("收到的檔案列表：", request.FILES)
+
+        image_file = request.FILES.get("image")
+        if not image_file:
+            return Response({"error": "沒有收到圖片"}, status=400)
+
+        target_user, err = _resolve_ocr_target(request)
+        if err:
+            return err
+
+        try:
+            return Response(analyze_prescription(image_file.read(), target_user), status=200)
+        except PrescriptionOcrError as e:
+            return Response(e.payload, status=e.status)
+        except Exception as e:
+            print("❌ 例外錯誤：", e)
+            return Response({"error": str(e)}, status=500)
+
+
+def _resolve_ocr_target(request):
+    """目標使用者（可傳 user_id，否則用登入者）→ (user, 錯誤 Response)"""
+    user_id = request.POST.get("user_id")
+    if not user_id:
+        return request.user, None
+    try:
+        return User.objects.get(UserID=int(user_id)), None
+    except (User.DoesNotExist, ValueError):
+        return None, Response({"error": "查無此使用者"}, status=404)
+
+
+#藥單 OCR（非同步）：POST 立刻回 job_id，背景跑 Vision → GPT → 入庫，GET 輪詢結果
+class OcrJobView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        image_file = request.FILES.get("image")
+        if not image_file:
+            return Response({"error": "沒有收到圖片"}, status=400)
+
+        target_user, err = _resolve_ocr_target(request)
+        if err:
+            return err
+
+        job = ocr_jobs.submit(request.user, target_user, image_file.read())
+        return Response({"job_id": str(job.JobID), "status": job.status}, status=202)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_ocr_job(request, job_id):
+    try:
+        job = OcrJob.objects.get(JobID=job_id)
+    except OcrJob.DoesNotExist:
+        return Response({"error": "查無此工作"}, status=404)
+
+    if request.user.UserID not in (job.UserID_id, job.TargetUserID_id):
+        return Response({"error": "無權限查詢此工作"}, status=403)
+
+    return Response({
+        "job_id": str(job.JobID),
+        "status": job.status,
+        "result": job.result,
+        "error": job.error or None,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    })
+
+#開始服藥
+@api_view(['POST'])
+def start_medication(request):
+    user_id = request.data.get('userId')
+    med_names = request.data.get('medName')  # 這裡可能是 list
+
+    if isinstance(med_names, str):
+        med_names = [med_names]
+    if not user_id or not med_names:
+        return Response({'error': '缺少 userId 或 medName'}, status=400)
+
+    try:
+        meds = doses.record_doses(user_id, med_names, recorded_by=request.user)
+    except doses.MedNotFound as e:
+        return Response({'error': '查無藥物', 'missing': e.names}, status=404)
+
+    results = [{
+        'medName': med.MedName,
+        'medId': med.MedId,
+        'currentDosage': med.CurrentDosage,
+        'totalDosage': med.TotalDosage,
+        'finished': med.FinishedAt is not None,
+        'message': '藥物已完成。' if med.FinishedAt is not None else '服藥次數已更新。',
+    } for med in meds]
+    return Response({'message': f'已記錄 {len(results)} 筆服藥', 'results': results}, status=status.HTTP_200_OK)
+
+
+#藥單查詢
+def _encode_rx_cursor(first_created, prescription_id):
+    raw = json.dumps([first_created.isoformat(), str(prescription_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_rx_cursor(cursor):
+    first_created, prescription_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return datetime.fromisoformat(first_created), uuid.UUID(prescription_id)
+
+
+class MedNameListView(APIView):
+    """
+    依藥單分組列出（DB 端 GROUP BY PrescriptionID，照第一次建立時間排序）。
+    帶 page_size 或 cursor 才分頁：一次最多 page_size 張藥單（預設 50，上限 100），還有下一頁時在
+    X-Next-Cursor 回傳 cursor，下一次帶 ?cursor= 接著拿。兩個都沒帶（現在的 App）就照舊回傳全部，
+    不然不讀 X-Next-Cursor 的前端會看不到第 50 張之後新開的藥單。回傳本體仍是 list。
+    """
+    permission_classes = [IsAuthenticated]
+    DEFAULT_PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 100
+
+    def get(self, request):
+        user_id_param = request.query_params.get('user_id')
+
+        # ✅ 如果有帶 user_id 就查指定長者，否則預設查自己
+        if user_id_param:
+            try:
+                user = User.objects.only('UserID').get(UserID=int(user_id_param))
+            except (User.DoesNotExist, ValueError):
+                return Response({'error': '查無此使用者'}, status=404)
+        else:
+            user = request.user
+
+        cursor = request.query_params.get('cursor')
+        paginate = cursor or 'page_size' in request.query_params
+        try:
+            page_size = min(int(request.query_params.get('page_size', self.DEFAULT_PAGE_SIZE)), self.MAX_PAGE_SIZE)
+        except ValueError:
+            return Response({'error': 'page_size 必須是整數'}, status=400)
+        page_size = max(page_size, 1)
+
+        groups = (Med.objects
+                  .filter(UserID=user, FinishedAt__isnull=True)
+                  .values('PrescriptionID')
+                  .annotate(med_count=Count('MedId'), first_created=Min('created_at'), Disease=Min('Disease'))
+                  .order_by('first_created', 'PrescriptionID'))
+
+        if cursor:
+            try:
+                after_created, after_id = _decode_rx_cursor(cursor)
+            except (ValueError, TypeError):
+                return Response({'error': 'cursor 格式錯誤'}, status=400)
+            groups = groups.filter(Q(first_created__gt=after_created) |
+                                   Q(first_created=after_created, PrescriptionID__gt=after_id))
+
+        if paginate:
+            page = list(groups[:page_size + 1])
+            has_more = len(page) > page_size
+            page = page[:page_size]
+        else:
+            page, has_more = list(groups), False
+
+        meds_by_rx = {}
+        for m in (Med.objects
+                  .filter(UserID=user, FinishedAt__isnull=True, PrescriptionID__in=[g['PrescriptionID'] for g in page])
+                  .order_by('MedId')
+                  .values('MedId', 'Disease', 'PrescriptionID')):
+            meds_by_rx.setdefault(m['PrescriptionID'], []).append({'MedId': m['MedId'], 'Disease': m['Disease']})
+
+        result = [{
+            'PrescriptionID': str(g['PrescriptionID']),
+            'Disease': g['Disease'],
+            'med_count': g['med_count'],
+            'first_created': g['first_created'],
+            'medications': meds_by_rx.get(g['PrescriptionID'], []),
+        } for g in page]
+
+        response = Response(result)
+        if has_more:
+            last = page[-1]
+            response['X-Next-Cursor'] = _encode_rx_cursor(last['first_created'], last['PrescriptionID'])
+        return response
+
+#藥單內容查詢
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_med_by_prescription(request, prescription_id):
+    meds = Med.objects.filter(PrescriptionID=prescription_id)
+    serializer = MedSerializer(meds, many=True)
+    return Response(serializer.data)
+#藥單刪除
+class DeletePrescriptionView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def delete(self, request, prescription_id):
+        user_id = request.query_params.get('user_id')
+        print('🔍 前端傳來的 user_id:', user_id)
+
+        target_user = User.objects.get(UserID=user_id) if user_id else request.user
+        print('🔍 目標使用者:', target_user)
+
+        deleted_count, _ = Med.objects.filter(PrescriptionID=prescription_id, UserID=target_user).delete()
+        print(f'✅ 刪除了 {deleted_count} 筆資料')
+        
+        return Response({'message': '已刪除', 'deleted_count': deleted_count}, status=status.HTTP_200_OK)
+#用藥時間設定
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def create_med_time_setting(request):
+    data = request.data.copy()
+
+    # ✅ 取得前端傳來的 UserID（選擇的長者）
+    user_id = data.get('UserID')
+    if not user_id:
+        return Response({"error": "缺少 UserID"}, status=400)
+
+    try:
+        user = User.objects.get(pk=user_id)
+    except User.DoesNotExist:
+        return Response({"error": "指定的 UserID 不存在"}, status=404)
+
+    # ✅ 準備欄位值
+    morning = data.get('MorningTime')
+    noon = data.get('NoonTime')
+    evening = data.get('EveningTime')
+    bedtime = data.get('Bedtime')
+
+    # ✅ 使用 update_or_create（不會新增多筆，只會更新或建立一筆）
+    setting, created = MedTimeSetting.objects.update_or_create(
+        UserID=user,
+        defaults={
+            "MorningTime": morning,
+            "NoonTime": noon,
+            "EveningTime": evening,
+            "Bedtime": bedtime
+        }
+    )
+
+    serializer = MedTimeSettingSerializer(setting)
+    return Response({
+        "status": "updated" if not created else "created",
+        "data": serializer.data
+    }, status=200)
+
+
+
+# from rest_framework.decorators import api_view, permission_classes
+# from rest_framework.permissions import IsAuthenticated
+# from rest_framework.response import Response
+# from .models import MedTimeSetting
+# from .serializers import MedTimeSettingSerializer
+
+# @api_view(['GET'])
+# @permission_classes([IsAuthenticated])
+# def get_med_time_setting(request):
+#     try:
+#         setting = MedTimeSetting.objects.get(UserID=request.user)
+#         serializer = MedTimeSettingSerializer(setting)
+#         return Response(serializer.data)
+#     except MedTimeSetting.DoesNotExist:
+#         return Response({'detail': '尚未設定時間'}, status=404)
+
+def _reminder_response(schedule):
+    """用藥時段表 → 提醒 API 的回傳格式；還沒設定時間 / 沒有藥時回 404"""
+    if not schedule["has_setting"]:
+        return Response({"error": "尚未設定用藥時間"}, status=404)
+    if not schedule["has_meds"]:
+        return Response({"error": "尚無藥物資料，請先新增藥物"}, status=404)
+    return Response(schedule["slots"])
+
+
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
+def get_med_reminders(request):
+    user = request.user
+
+    # ✅ 你的定義：RelatedID 有值 = 長者；None = 家人
+    # 家人不允許查詢（這支是給長者本人用）
+    if user.RelatedID is None:
+        return Response({"error": "此帳號為家人，無法取得用藥提醒"}, status=403)
+
+    return _reminder_response(med_schedule.get_schedule(user.UserID))
+
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
+def get_med_reminders_by_userid(request):
+    user = request.user
+    user_id = request.query_params.get('user_id')
+    if not user_id:
+        return Response({'error': '缺少 user_id'}, status=400)
+    try:
+        target = User.objects.only('UserID', 'FamilyID').get(UserID=user_id)
+    except User.DoesNotExist:
+        return Response({'error': '查無此用戶'}, status=404)
+    # 權限檢查：只能查自己或同家庭
+    if user.UserID != target.UserID:
+        if not (user.FamilyID_id and user.FamilyID_id == target.FamilyID_id):
+            return Response({'error': '無權限查詢此用戶'}, status=403)
+    return _reminder_response(med_schedule.get_schedule(target.UserID))
+
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
+def get_family_med_reminders(request, family_id: int):
+    # 家人首頁：一次拿整個家庭所有長者的用藥提醒（固定 ≤ 3 次查詢，不會隨人數增加）
+    if request.user.FamilyID_id is None:
+        return Response({'error': '尚未加入任何家庭'}, status=400)
+    if request.user.FamilyID_id != family_id:
+        return Response({'error': '無權存取'}, status=403)
+
+    # 長者：is_elder，或沿用提醒 API 的定義 RelatedID 有值
+    elders = list(User.objects
+                  .filter(Q(is_elder=True) | Q(RelatedID__isnull=False), FamilyID_id=family_id)
+                  .order_by('UserID')
+                  .values('UserID', 'Name'))
+    schedules = med_schedule.get_schedules(e['UserID'] for e in elders)
+
+    results = []
+    for e in elders:
+        schedule = schedules[e['UserID']]
+        results.append({
+            'user_id': e['UserID'],
+            'name': e['Name'],
+            'has_setting': schedule['has_setting'],
+            'has_meds': schedule['has_meds'],
+            'reminders': schedule['slots'] if schedule['has_setting'] and schedule['has_meds'] else None,
+        })
+    return Response({'family_id': family_id, 'count': len(results), 'results': results})
+
+def _parse_range_param(value, default):
+    if not value:
+        return default
+    dt = parse_datetime(value)
+    if dt is None:
+        raise ValueError(value)
+    if timezone.is_naive(dt):
+        dt = dt.replace(tzinfo=reminder_occurrences.TAIPEI)   # 沒帶時區視為台灣時間
+    return dt
+
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
+def get_upcoming_reminders(request):
+    # 預先展開好的提醒（ReminderOccurrence）：一次 (UserID, RemindAt) 範圍查詢
+    # ?user_id= 不帶就是自己；?start= / ?end= 為 ISO 時間，預設從現在起 24 小時
+    user = request.user
+    user_id = request.query_params.get('user_id')
+    if user_id and str(user_id) != str(user.UserID):
+        try:
+            target = User.objects.only('UserID', 'FamilyID').get(UserID=user_id)
+        except (User.DoesNotExist, ValueError):
+            return Response({'error': '查無此用戶'}, status=404)
+        if not (user.FamilyID_id and user.FamilyID_id == target.FamilyID_id):
+            return Response({'error': '無權限查詢此用戶'}, status=403)
+        target_id = target.UserID
+    else:
+        target_id = user.UserID
+
+    try:
+        start = _parse_range_param(request.query_params.get('start'), timezone.now())
+        end = _parse_range_param(request.query_params.get('end'), start + timedelta(days=1))
+    except ValueError as e:
+        return Response({'error': f'時間格式錯誤：{e}'}, status=400)
+    if end <= start:
+        return Response({'error': 'end 必須晚於 start'}, status=400)
+
+    rows = (ReminderOccurrence.objects
+            .filter(UserID_id=target_id, RemindAt__gte=start, RemindAt__lt=end)
+            .order_by('RemindAt')
+            .values('RemindAt', 'Slot', 'MedName', 'DosageFrequency', 'PrescriptionID', 'Disease'))
+    results = [{
+        'at': r['RemindAt'].astimezone(reminder_occurrences.TAIPEI).isoformat(),
+        'slot': r['Slot'],
+        'med_name': r['MedName'],
+        'freq': r['DosageFrequency'],
+        'prescription_id': str(r['PrescriptionID']),
+        'disease': r['Disease'],
+    } for r in rows]
+    return Response({'user_id': target_id, 'start': start.isoformat(), 'end': end.isoformat(),
+                     'count': len(results), 'results': results})